@@ -12,7 +12,7 @@ from sqlalchemy import pool
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from app.db.postgres import Base
-from app.models import User, Session, Message  # noqa: F401
+from app.models import User, Session, Message, MemoryIngestJob, MaintenanceRun  # noqa: F401
 
 import os
 
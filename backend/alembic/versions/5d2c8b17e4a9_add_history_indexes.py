@@ -0,0 +1,41 @@
+"""add newest-first history indexes
+
+Revision ID: 5d2c8b17e4a9
+Revises: 9a41d7e2b6f3
+Create Date: 2026-10-17 18:21:37.114902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2c8b17e4a9'
+down_revision: Union[str, None] = '9a41d7e2b6f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_messages_session_id_created_at', 'messages', ['session_id', sa.text('created_at DESC')]),
+    ('ix_messages_user_id_created_at', 'messages', ['user_id', sa.text('created_at DESC')]),
+    ('ix_sessions_user_id_started_at', 'sessions', ['user_id', sa.text('started_at DESC')]),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps the chat writable while messages is indexed; it
+    # cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,28 @@
+"""add session summary
+
+Revision ID: 74c7419290f7
+Revises: 4b3adb1223da
+Create Date: 2026-10-17 10:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '74c7419290f7'
+down_revision: Union[str, None] = '4b3adb1223da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sessions', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('sessions', sa.Column('summary_message_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('sessions', 'summary_message_count')
+    op.drop_column('sessions', 'summary')
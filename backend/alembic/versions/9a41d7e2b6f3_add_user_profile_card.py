@@ -0,0 +1,28 @@
+"""add user profile card
+
+Revision ID: 9a41d7e2b6f3
+Revises: c3e81f5a9d20
+Create Date: 2026-10-17 16:40:12.508331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a41d7e2b6f3'
+down_revision: Union[str, None] = 'c3e81f5a9d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('profile_card', sa.Text(), nullable=True))
+    op.add_column('users', sa.Column('profile_updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'profile_updated_at')
+    op.drop_column('users', 'profile_card')
@@ -0,0 +1,30 @@
+"""add maintenance runs
+
+Revision ID: b2f6d91c3a07
+Revises: e7b4a0c95f13
+Create Date: 2026-10-17 22:41:09.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f6d91c3a07'
+down_revision: Union[str, None] = 'e7b4a0c95f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('maintenance_runs',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('maintenance_runs')
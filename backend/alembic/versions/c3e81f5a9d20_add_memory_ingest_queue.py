@@ -0,0 +1,41 @@
+"""add memory ingest queue
+
+Revision ID: c3e81f5a9d20
+Revises: 74c7419290f7
+Create Date: 2026-10-17 14:02:51.774120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e81f5a9d20'
+down_revision: Union[str, None] = '74c7419290f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('memory_ingest_queue',
+    sa.Column('source_message_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('user_text', sa.Text(), nullable=False),
+    sa.Column('assistant_text', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['source_message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('source_message_id')
+    )
+    op.create_index('ix_memory_ingest_queue_pending', 'memory_ingest_queue', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_memory_ingest_queue_pending', table_name='memory_ingest_queue')
+    op.drop_table('memory_ingest_queue')
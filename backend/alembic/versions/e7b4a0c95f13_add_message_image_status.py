@@ -0,0 +1,26 @@
+"""add message image status
+
+Revision ID: e7b4a0c95f13
+Revises: 5d2c8b17e4a9
+Create Date: 2026-10-17 20:05:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b4a0c95f13'
+down_revision: Union[str, None] = '5d2c8b17e4a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('image_status', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('messages', 'image_status')
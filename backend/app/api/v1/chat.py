@@ -1,44 +1,35 @@
 import base64
+import binascii
 import json
 import logging
 import uuid
-from pathlib import Path
+from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sse_starlette.sse import EventSourceResponse
 
 from app.api.deps import get_current_user
-from app.db.postgres import get_db
+from app.core import background_tasks
+from app.core.metrics import metrics
+from app.db.postgres import async_session, get_db
 from app.models.session import Message, Session
 from app.models.user import User
 from app.core.config import settings
+from app.image.jobs import JOB_DONE, JOB_FAILED, JOB_PENDING, image_jobs
 from app.orchestrator.guardian import Guardian
 from app.orchestrator.agent import run_agent
-from app.orchestrator.memory import remember, extract_facts
+from app.orchestrator.memory_queue import enqueue_memory, memory_ingest
+from app.orchestrator.profile import schedule_profile_update
+from app.orchestrator.summarizer import schedule_summary, unsummarized_count
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 guardian = Guardian()
 
-_IMAGES_DIR = Path(__file__).parent.parent.parent.parent / "uploads" / "images"
-_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-
-
-def _save_images_to_disk(base64_images: list[str], msg_id: uuid.UUID) -> list[str]:
-    """Save base64 images to disk, return list of URL paths."""
-    urls = []
-    for i, b64 in enumerate(base64_images):
-        filename = f"{msg_id}_{i}.png"
-        filepath = _IMAGES_DIR / filename
-        filepath.write_bytes(base64.b64decode(b64))
-        urls.append(f"/uploads/images/{filename}")
-        logger.info("Saved image: %s", filename)
-    return urls
-
 
 class ChatRequest(BaseModel):
     content: str
@@ -56,6 +47,95 @@ class MessageResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class MessageImagesResponse(BaseModel):
+    status: str
+    image_urls: list[str] | None = None
+
+
+class HistoryPage(BaseModel):
+    messages: list[MessageResponse]
+    next_cursor: str | None = None
+
+
+class SessionResponse(BaseModel):
+    id: str
+    started_at: str
+    message_count: int
+
+
+class SessionsPage(BaseModel):
+    sessions: list[SessionResponse]
+    next_cursor: str | None = None
+
+
+def encode_cursor(at: datetime, row_id: uuid.UUID) -> str:
+    """Opaque page cursor for the row at (``at``, ``row_id``)."""
+    raw = f"{at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        at, row_id = raw.split("|")
+        return datetime.fromisoformat(at), uuid.UUID(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _page_bounds(before: str | None, after: str | None):
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass either before or after, not both",
+        )
+    return (
+        decode_cursor(before) if before else None,
+        decode_cursor(after) if after else None,
+    )
+
+
+# Newest-first reads, each served by a (user/session, time DESC) index so the
+# first rows come straight off the index with no scan or sort
+# (scripts/explain_history_queries.py checks the plans). Pages are keyset
+# ranges on (time, id): any page costs one index descent plus ``limit``
+# rows, however deep the client has scrolled.
+
+def latest_session_messages_query(session_id, limit: int):
+    """Newest ``limit`` messages of a session, newest first."""
+    return (
+        select(Message)
+        .where(Message.session_id == session_id)
+        .order_by(desc(Message.created_at))
+        .limit(limit)
+    )
+
+
+def _keyset_page(query, at_column, id_column, limit: int, before=None, after=None):
+    """``limit`` rows older than ``before`` (newest first) or newer than
+    ``after`` (oldest first); the newest rows when neither is given."""
+    key = tuple_(at_column, id_column)
+    if after:
+        return query.where(key > tuple_(*after)).order_by(at_column, id_column).limit(limit)
+    if before:
+        query = query.where(key < tuple_(*before))
+    return query.order_by(desc(at_column), desc(id_column)).limit(limit)
+
+
+def user_messages_page_query(user_id, limit: int, session_id=None, before=None, after=None):
+    """A page of a user's messages (optionally one session), see ``_keyset_page``."""
+    query = select(Message).where(Message.user_id == user_id)
+    if session_id:
+        query = query.where(Message.session_id == session_id)
+    return _keyset_page(query, Message.created_at, Message.id, limit, before, after)
+
+
+def sessions_page_query(user_id, limit: int, before=None, after=None):
+    """A page of a user's sessions, see ``_keyset_page``."""
+    query = select(Session).where(Session.user_id == user_id)
+    return _keyset_page(query, Session.started_at, Session.id, limit, before, after)
+
+
 @router.post("/message")
 async def send_message(
     body: ChatRequest,
@@ -142,14 +222,14 @@ async def send_message(
     db.add(user_msg)
     await db.commit()
 
-    # Get conversation history (only what we need)
+    # Get conversation history (only what we need): the latest N, oldest first
     history_result = await db.execute(
-        select(Message)
-        .where(Message.session_id == session.id)
-        .order_by(Message.created_at)
-        .limit(settings.agent_context_messages)
+        latest_session_messages_query(session.id, settings.agent_context_messages)
     )
-    history = history_result.scalars().all()
+    history = history_result.scalars().all()[::-1]
+    if session.summary:
+        # Older messages are covered by the rolling summary (+1: the new user message)
+        history = history[-(unsummarized_count(session) + 1):]
 
     logger.info(
         "[user:%s] starting agent (mode=%s, history=%d msgs)",
@@ -160,123 +240,252 @@ async def send_message(
     assistant_msg_id = uuid.uuid4()
     current_mode = user.current_mode
 
+    async def save_partial_reply(content: str) -> None:
+        """Persist what was streamed before the client went away."""
+        async with async_session() as partial_db:
+            partial_db.add(Message(
+                id=assistant_msg_id,
+                session_id=session.id,
+                user_id=user.id,
+                role="assistant",
+                content=content,
+                mode=current_mode,
+                image_status=image_jobs.status(assistant_msg_id),
+            ))
+            await partial_db.execute(
+                update(Session)
+                .where(Session.id == session.id)
+                .values(message_count=Session.message_count + 2)
+            )
+            await partial_db.commit()
+
+    async def on_disconnect(agent_events, content: str, saved: bool) -> None:
+        # Runs as its own task: the request's task is being cancelled
+        try:
+            await agent_events.aclose()  # closes the Ollama stream
+        except Exception as e:
+            logger.warning("[user:%s] closing agent stream failed: %s", user_id_short, e)
+        # A saved reply's image still gets delivered via the images endpoint
+        if settings.image_job_cancel_on_disconnect and not saved:
+            image_jobs.cancel(assistant_msg_id)
+        # Nothing streamed and no image coming: there is no reply to keep
+        if not saved and (content or image_jobs.get(assistant_msg_id) is not None):
+            try:
+                await save_partial_reply(content)
+                image_jobs.mark_persisted(assistant_msg_id)
+            except Exception as e:
+                logger.error("[user:%s] saving partial reply failed: %s", user_id_short, e)
+
     async def generate():
         full_response = []
-        collected_images: list[str] = []  # base64 images collected during streaming
-
-        async for event in run_agent(body.content, history, user, current_mode):
-            if event["type"] == "token":
-                full_response.append(event["content"])
-                yield json.dumps({
-                    "token": event["content"],
+        image_job = None
+        image_delivered = False
+        saved = False
+        finished = False
+
+        def image_event() -> str:
+            """``image`` with the urls, or ``image_failed`` if the job produced none."""
+            if not image_job.image_urls:
+                return json.dumps({
+                    "event": "image_failed",
+                    "status": image_job.status,
                     "session_id": str(session.id),
                     "msg_id": str(assistant_msg_id),
-                    "mode": current_mode,
-                })
-            elif event["type"] == "image":
-                collected_images.extend(event["images"])
-                # Save images to disk immediately and send URLs to frontend
-                image_urls = _save_images_to_disk(event["images"], assistant_msg_id)
-                yield json.dumps({
-                    "event": "image",
-                    "image_urls": image_urls,
-                    "session_id": str(session.id),
-                    "msg_id": str(assistant_msg_id),
-                    "mode": current_mode,
-                })
-            elif event["type"] == "tool_start":
-                yield json.dumps({
-                    "event": "tool_start",
-                    "tool": event["tool"],
-                    "session_id": str(session.id),
-                    "mode": current_mode,
-                })
-            elif event["type"] == "tool_done":
-                yield json.dumps({
-                    "event": "tool_done",
-                    "tool": event["tool"],
-                    "session_id": str(session.id),
-                    "mode": current_mode,
                 })
+            return json.dumps({
+                "event": "image",
+                "image_urls": image_job.image_urls,
+                "session_id": str(session.id),
+                "msg_id": str(assistant_msg_id),
+                "mode": current_mode,
+            })
 
-        # Save assistant message after streaming completes
-        content = "".join(full_response)
-        # Images were already saved during streaming; just build URL list for DB
-        saved_urls = [
-            f"/uploads/images/{assistant_msg_id}_{i}.png"
-            for i in range(len(collected_images))
-        ] if collected_images else None
-
-        assistant_msg = Message(
-            id=assistant_msg_id,
-            session_id=session.id,
-            user_id=user.id,
-            role="assistant",
-            content=content,
-            mode=current_mode,
-            image_urls=saved_urls,
+        agent_events = run_agent(
+            body.content, history, user, current_mode, assistant_msg_id, session.summary
         )
-        db.add(assistant_msg)
-        session.message_count = (session.message_count or 0) + 2
-        await db.commit()
-
-        # Write memories (background, after stream)
-        facts = extract_facts(body.content, content)
-        for fact in facts:
-            vector_id = await remember(
-                user_id=str(user.id),
-                text=fact,
-                source_message_id=str(assistant_msg_id),
+        try:
+            async for event in agent_events:
+                if event["type"] == "token":
+                    full_response.append(event["content"])
+                    yield json.dumps({
+                        "token": event["content"],
+                        "session_id": str(session.id),
+                        "msg_id": str(assistant_msg_id),
+                        "mode": current_mode,
+                    })
+                elif event["type"] == "image_pending":
+                    image_job = image_jobs.get(assistant_msg_id)
+                    yield json.dumps({
+                        "event": "image_pending",
+                        "session_id": str(session.id),
+                        "msg_id": str(assistant_msg_id),
+                    })
+                elif event["type"] == "tool_start":
+                    yield json.dumps({
+                        "event": "tool_start",
+                        "tool": event["tool"],
+                        "session_id": str(session.id),
+                        "mode": current_mode,
+                    })
+                elif event["type"] == "tool_done":
+                    yield json.dumps({
+                        "event": "tool_done",
+                        "tool": event["tool"],
+                        "session_id": str(session.id),
+                        "mode": current_mode,
+                    })
+
+                # Push the image as soon as the background job has it
+                if image_job and not image_delivered and image_job.finished.is_set():
+                    image_delivered = True
+                    yield image_event()
+
+            # Save assistant message after streaming completes, queueing its
+            # memories in the same transaction; a still-running image job
+            # writes image_urls itself once it finishes
+            content = "".join(full_response)
+            assistant_msg = Message(
+                id=assistant_msg_id,
+                session_id=session.id,
+                user_id=user.id,
+                role="assistant",
+                content=content,
+                mode=current_mode,
+                image_urls=image_job.image_urls if image_job else None,
+                image_status=image_job.status if image_job else None,
             )
-            assistant_msg.vector_id = vector_id
+            db.add(assistant_msg)
+            session.message_count = (session.message_count or 0) + 2
+            enqueue_memory(db, assistant_msg_id, user.id, body.content, content)
             await db.commit()
+            saved = True
+            image_jobs.mark_persisted(assistant_msg_id)
+            memory_ingest.notify()
+            schedule_summary(session)
+            schedule_profile_update(user.id)
+
+            # Late delivery: keep the stream open until the image job completes.
+            # Clients that leave earlier can poll GET /chat/messages/{id}/images.
+            if image_job and not image_delivered:
+                await image_job.finished.wait()
+                yield image_event()
+            finished = True
+        finally:
+            if not finished:
+                # Client disconnected (the response task was cancelled, or this
+                # generator was closed while waiting to send)
+                metrics.incr("chat.disconnects")
+                logger.info(
+                    "[user:%s] client disconnected after %d tokens",
+                    user_id_short, len(full_response),
+                )
+                background_tasks.spawn(
+                    on_disconnect(agent_events, "".join(full_response), saved)
+                )
 
     return EventSourceResponse(generate())
 
 
-@router.get("/history")
+@router.get("/messages/{message_id}/images", response_model=MessageImagesResponse)
+async def get_message_images(
+    message_id: uuid.UUID,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Follow-up for image jobs that finish after the SSE stream is gone."""
+    job = image_jobs.get(message_id)
+    if job and job.user_id == user.id:
+        return MessageImagesResponse(status=job.status, image_urls=job.image_urls)
+
+    result = await db.execute(
+        select(Message).where(Message.id == message_id, Message.user_id == user.id)
+    )
+    message = result.scalar_one_or_none()
+    if not message:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+    return MessageImagesResponse(
+        status=_stored_image_status(message), image_urls=message.image_urls
+    )
+
+
+def _stored_image_status(message: Message) -> str:
+    """Image status from the row, for jobs this worker doesn't hold."""
+    if message.image_urls:
+        return JOB_DONE
+    if message.image_status == JOB_PENDING:
+        # Running in another worker; past the generation timeout it died
+        # with a restart and will never write its outcome
+        deadline = message.created_at + timedelta(seconds=settings.agent_image_tool_timeout)
+        return JOB_PENDING if datetime.now(timezone.utc) < deadline else JOB_FAILED
+    return message.image_status or "none"
+
+
+@router.get("/history", response_model=HistoryPage)
 async def get_history(
     session_id: str | None = None,
-    limit: int = settings.chat_history_default_limit,
+    limit: int = Query(settings.chat_history_default_limit, ge=1, le=settings.chat_page_max_limit),
+    before: str | None = None,
+    after: str | None = None,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    query = select(Message).where(Message.user_id == user.id)
-    if session_id:
-        query = query.where(Message.session_id == session_id)
-    query = query.order_by(desc(Message.created_at)).limit(limit)
-    result = await db.execute(query)
+    """Messages oldest first. Scroll back with ``before=next_cursor``; with
+    ``after``, ``next_cursor`` continues forward instead."""
+    before_key, after_key = _page_bounds(before, after)
+    result = await db.execute(
+        user_messages_page_query(user.id, limit, session_id, before_key, after_key)
+    )
     messages = result.scalars().all()
-    return [
-        MessageResponse(
-            id=str(m.id),
-            role=m.role,
-            content=m.content,
-            mode=m.mode,
-            created_at=m.created_at.isoformat(),
-            image_urls=m.image_urls,
-        )
-        for m in reversed(messages)
-    ]
+    if not after:
+        messages = messages[::-1]
+    next_cursor = None
+    if len(messages) == limit:
+        # The far end of the page in the direction being paged
+        edge = messages[-1] if after else messages[0]
+        next_cursor = encode_cursor(edge.created_at, edge.id)
+    return HistoryPage(
+        messages=[
+            MessageResponse(
+                id=str(m.id),
+                role=m.role,
+                content=m.content,
+                mode=m.mode,
+                created_at=m.created_at.isoformat(),
+                image_urls=m.image_urls,
+            )
+            for m in messages
+        ],
+        next_cursor=next_cursor,
+    )
 
 
-@router.get("/sessions")
+@router.get("/sessions", response_model=SessionsPage)
 async def get_sessions(
+    limit: int = Query(settings.chat_sessions_default_limit, ge=1, le=settings.chat_page_max_limit),
+    before: str | None = None,
+    after: str | None = None,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(Session)
-        .where(Session.user_id == user.id)
-        .order_by(desc(Session.started_at))
-        .limit(settings.chat_sessions_default_limit)
-    )
+    """Sessions newest first. Page down with ``before=next_cursor``; with
+    ``after``, ``next_cursor`` continues towards newer sessions."""
+    before_key, after_key = _page_bounds(before, after)
+    result = await db.execute(sessions_page_query(user.id, limit, before_key, after_key))
     sessions = result.scalars().all()
-    return [
-        {
-            "id": str(s.id),
-            "started_at": s.started_at.isoformat(),
-            "message_count": s.message_count,
-        }
-        for s in sessions
-    ]
+    if after:
+        sessions = sessions[::-1]
+    next_cursor = None
+    if len(sessions) == limit:
+        edge = sessions[0] if after else sessions[-1]
+        next_cursor = encode_cursor(edge.started_at, edge.id)
+    return SessionsPage(
+        sessions=[
+            SessionResponse(
+                id=str(s.id),
+                started_at=s.started_at.isoformat(),
+                message_count=s.message_count,
+            )
+            for s in sessions
+        ],
+        next_cursor=next_cursor,
+    )
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+from collections.abc import Coroutine
+
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks — hold them until done
+_tasks: set[asyncio.Task] = set()
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task %s failed: %s", task.get_name(), task.exception())
+
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """Run ``coro`` detached from the current request."""
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
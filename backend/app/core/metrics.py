@@ -0,0 +1,50 @@
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """In-process counters and value summaries, exposed via GET /metrics.
+
+    Deliberately tiny: each uvicorn worker keeps its own numbers, which is
+    enough to compare rates (hits vs misses, used vs wasted) on a host.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._summaries: dict[str, dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a sample (latency, batch size...) as count/sum/min/max."""
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                self._summaries[name] = {
+                    "count": 1, "sum": value, "min": value, "max": value,
+                }
+                return
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "summaries": {
+                    name: {**s, "avg": s["sum"] / s["count"]}
+                    for name, s in self._summaries.items()
+                },
+            }
+
+
+metrics = Metrics()
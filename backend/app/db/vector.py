@@ -1,31 +1,174 @@
-from qdrant_client import QdrantClient, models
+import asyncio
+import inspect
+import logging
+
+import httpx
+from qdrant_client import AsyncQdrantClient, models
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+TENANT_FIELD = "user_id"
+
+
+def _user_filter(user_id: str) -> models.Filter:
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key=TENANT_FIELD,
+                match=models.MatchValue(value=user_id),
+            )
+        ]
+    )
+
+
+def _hit(point) -> dict:
+    return {"text": point.payload.get("text", ""), "score": point.score}
+
+
+def _hnsw_config() -> models.HnswConfigDiff:
+    # payload_m builds an extra HNSW graph per user_id value, which is what
+    # every (user-filtered) search walks; m=0 drops the global graph entirely
+    return models.HnswConfigDiff(
+        m=settings.qdrant_hnsw_m,
+        ef_construct=settings.qdrant_hnsw_ef_construct,
+        payload_m=settings.qdrant_hnsw_payload_m,
+    )
+
+
+def _quantization_config() -> models.ScalarQuantization | None:
+    if not settings.qdrant_quantization:
+        return None
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=0.99,
+            always_ram=True,
+        )
+    )
+
+
+def _tenant_index() -> models.KeywordIndexParams:
+    return models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True)
+
+
+def _search_params() -> models.SearchParams | None:
+    if not settings.qdrant_quantization:
+        return None
+    # Walk the int8 copies, then re-rank the oversampled candidates on the
+    # original float32 vectors
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(
+            rescore=True, oversampling=settings.qdrant_quantization_oversampling
+        )
+    )
+
+
+def _client_kwargs() -> dict:
+    return {
+        "url": settings.qdrant_url,
+        "prefer_grpc": settings.qdrant_prefer_grpc,
+        "grpc_port": settings.qdrant_grpc_port,
+        "timeout": settings.qdrant_timeout,
+        # Only used by the REST transport; gRPC multiplexes over one channel
+        "limits": httpx.Limits(
+            max_connections=settings.qdrant_pool_size,
+            max_keepalive_connections=settings.qdrant_pool_size,
+        ),
+    }
+
 
 class VectorStore:
+    """Async Qdrant access (REST, or gRPC with ``qdrant_prefer_grpc``)."""
+
     def __init__(self):
-        self._client: QdrantClient | None = None
-
-    def connect(self) -> None:
-        """Called once during FastAPI lifespan startup."""
-        self._client = QdrantClient(url=settings.qdrant_url)
-        collections = [c.name for c in self._client.get_collections().collections]
-        if settings.qdrant_collection_name not in collections:
-            self._client.create_collection(
-                collection_name=settings.qdrant_collection_name,
-                vectors_config=models.VectorParams(
-                    size=settings.embedding_vector_dim,
-                    distance=models.Distance.COSINE,
-                ),
+        self._client: AsyncQdrantClient | None = None
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        return self._client
+
+    async def connect(self, provision: bool = True) -> None:
+        """Called once during FastAPI lifespan startup.
+
+        ``provision=False`` only opens the client (migration scripts that
+        manage collections themselves).
+        """
+        self._client = AsyncQdrantClient(**_client_kwargs())
+        if provision:
+            await self.ensure_collection(settings.qdrant_collection_name)
+
+    async def ensure_collection(self, name: str) -> None:
+        """Create ``name`` with the tuning settings, or migrate it to them."""
+        if not await self._client.collection_exists(name):
+            await self.create_collection(name)
+        else:
+            await self.migrate_collection(name)
+
+    async def create_collection(self, name: str, dim: int | None = None) -> None:
+        await self._client.create_collection(
+            collection_name=name,
+            vectors_config=models.VectorParams(
+                size=dim or settings.embedding_vector_dim,
+                distance=models.Distance.COSINE,
+                on_disk=settings.qdrant_vectors_on_disk,
+            ),
+            hnsw_config=_hnsw_config(),
+            quantization_config=_quantization_config(),
+        )
+        await self._client.create_payload_index(
+            collection_name=name, field_name=TENANT_FIELD, field_schema=_tenant_index()
+        )
+        logger.info("Qdrant collection %s created", name)
+
+    async def migrate_collection(self, name: str) -> None:
+        """Apply the tuning settings to an existing collection.
+
+        Only what differs is sent: Qdrant rebuilds the HNSW graph or the
+        quantized copies in the background after such an update.
+        """
+        info = await self._client.get_collection(name)
+        config = info.config
+        changes = {}
+
+        hnsw = config.hnsw_config
+        wanted = _hnsw_config()
+        if (hnsw.m, hnsw.ef_construct, hnsw.payload_m) != (
+            wanted.m, wanted.ef_construct, wanted.payload_m
+        ):
+            changes["hnsw_config"] = wanted
+
+        quantization = _quantization_config()
+        if quantization is not None and config.quantization_config != quantization:
+            changes["quantization_config"] = quantization
+        elif quantization is None and config.quantization_config is not None:
+            changes["quantization_config"] = models.Disabled.DISABLED
+
+        if bool(config.params.vectors.on_disk) != settings.qdrant_vectors_on_disk:
+            changes["vectors_config"] = {
+                "": models.VectorParamsDiff(on_disk=settings.qdrant_vectors_on_disk)
+            }
+
+        if changes:
+            await self._client.update_collection(collection_name=name, **changes)
+            logger.info("Qdrant collection %s migrated: %s", name, ", ".join(changes))
+
+        index = info.payload_schema.get(TENANT_FIELD)
+        if index is None or not getattr(index.params, "is_tenant", False):
+            if index is not None:
+                await self._client.delete_payload_index(name, TENANT_FIELD)
+            await self._client.create_payload_index(
+                collection_name=name, field_name=TENANT_FIELD, field_schema=_tenant_index()
             )
+            logger.info("Qdrant collection %s: tenant index on %s created", name, TENANT_FIELD)
 
-    def upsert(
+    async def upsert(
         self,
         vector_id: str,
         embedding: list[float],
         payload: dict,
     ) -> None:
-        self._client.upsert(
+        await self._client.upsert(
             collection_name=settings.qdrant_collection_name,
             points=[
                 models.PointStruct(
@@ -36,7 +179,39 @@ class VectorStore:
             ],
         )
 
-    def search(
+    async def upsert_many(
+        self,
+        vector_ids: list[str],
+        embeddings: list[list[float]],
+        payloads: list[dict],
+        batch_size: int | None = None,
+        parallel: int | None = None,
+        collection: str | None = None,
+    ) -> None:
+        """Upsert many points, ``batch_size`` per request, ``parallel`` requests at a time.
+
+        ``collection`` overrides the configured one (used by migrations).
+        """
+        collection = collection or settings.qdrant_collection_name
+        batch_size = batch_size or settings.qdrant_upsert_batch_size
+        parallel = parallel or settings.qdrant_upsert_parallelism
+        chunks = [
+            models.Batch(
+                ids=vector_ids[i:i + batch_size],
+                vectors=embeddings[i:i + batch_size],
+                payloads=payloads[i:i + batch_size],
+            )
+            for i in range(0, len(vector_ids), batch_size)
+        ]
+        slots = asyncio.Semaphore(parallel)
+
+        async def upsert_chunk(chunk: models.Batch) -> None:
+            async with slots:
+                await self._client.upsert(collection_name=collection, points=chunk)
+
+        await asyncio.gather(*(upsert_chunk(chunk) for chunk in chunks))
+
+    async def search(
         self,
         embedding: list[float],
         user_id: str,
@@ -44,27 +219,118 @@ class VectorStore:
     ) -> list[dict]:
         if limit is None:
             limit = settings.memory_recall_limit
-        results = self._client.query_points(
+        results = await self._client.query_points(
             collection_name=settings.qdrant_collection_name,
             query=embedding,
-            query_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="user_id",
-                        match=models.MatchValue(value=user_id),
-                    )
-                ]
-            ),
+            query_filter=_user_filter(user_id),
+            search_params=_search_params(),
             limit=limit,
         )
-        return [
-            {"text": point.payload.get("text", ""), "score": point.score}
-            for point in results.points
-        ]
+        return [_hit(point) for point in results.points]
 
-    def close(self) -> None:
+    async def search_many(
+        self,
+        embeddings: list[list[float]],
+        user_id: str,
+        limit: int | None = None,
+    ) -> list[list[dict]]:
+        """Several queries for one user in a single round trip, results in query order."""
+        if limit is None:
+            limit = settings.memory_recall_limit
+        if not embeddings:
+            return []
+        user_filter = _user_filter(user_id)
+        search_params = _search_params()
+        responses = await self._client.query_batch_points(
+            collection_name=settings.qdrant_collection_name,
+            requests=[
+                models.QueryRequest(
+                    query=embedding,
+                    filter=user_filter,
+                    params=search_params,
+                    limit=limit,
+                    with_payload=True,
+                )
+                for embedding in embeddings
+            ],
+        )
+        return [[_hit(point) for point in response.points] for response in responses]
+
+    async def scroll_user(self, user_id: str) -> list[dict]:
+        """Every point of one user as ``{"id", "vector", "payload"}``."""
+        points = []
+        offset = None
+        while True:
+            batch, offset = await self._client.scroll(
+                collection_name=settings.qdrant_collection_name,
+                scroll_filter=_user_filter(user_id),
+                limit=1000,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            points.extend(
+                {"id": str(p.id), "vector": p.vector, "payload": p.payload} for p in batch
+            )
+            if offset is None:
+                return points
+
+    async def delete(self, user_id: str, vector_ids: list[str]) -> None:
+        """Delete points by id, only among ``user_id``'s own points."""
+        if vector_ids:
+            user_filter = _user_filter(user_id)
+            user_filter.must.append(models.HasIdCondition(has_id=vector_ids))
+            await self._client.delete(
+                collection_name=settings.qdrant_collection_name,
+                points_selector=models.FilterSelector(filter=user_filter),
+            )
+
+    async def close(self) -> None:
         if self._client:
-            self._client.close()
+            await self._client.close()
+
+
+class SyncVectorStore:
+    """Blocking facade over a vector store backend for scripts and CLIs.
+
+    Runs every call to completion on a private event loop, so scripts get
+    the same code path (and transport settings) as the API:
+
+        store = SyncVectorStore()
+        store.connect()
+        store.search(embedding, user_id)
+    """
+
+    def __init__(self, store=None):
+        self._loop = asyncio.new_event_loop()
+        self._store = store or create_vector_store()
+
+    def run(self, coro):
+        """Run any coroutine (e.g. a raw ``client`` call) on the facade's loop."""
+        return self._loop.run_until_complete(coro)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._store, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self.run(attr(*args, **kwargs))
+
+        return call
+
+    def close(self) -> None:
+        self.run(self._store.close())
+        self._loop.close()
+
+
+def create_vector_store():
+    """The backend selected by ``vector_backend``: "qdrant" or "local"."""
+    if settings.vector_backend == "local":
+        from app.db.vector_local import LocalVectorStore
+
+        return LocalVectorStore()
+    return VectorStore()
 
 
-vector_store = VectorStore()
+vector_store = create_vector_store()
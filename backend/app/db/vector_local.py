@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_INITIAL_CAPACITY = 256
+
+
+class _UserIndex:
+    """One user's memories: a float32 matrix memory-mapped from disk.
+
+    ``vectors.npy`` holds unit-normalized rows (grown by doubling, so rows
+    stay contiguous); ``points.jsonl`` is an append-only log of
+    ``{"id", "row", "payload"}`` where the last line for an id wins. A
+    vector is flushed before its log line is written, so a crash at worst
+    leaves an unreferenced row that the next insert reuses.
+    """
+
+    def __init__(self, path: Path, dim: int):
+        self.lock = threading.Lock()
+        self._path = path
+        self._dim = dim
+        self._rows: dict[str, int] = {}
+        self.payloads: list[dict] = []
+        self.closed = False
+
+        path.mkdir(parents=True, exist_ok=True)
+        vectors_file = path / "vectors.npy"
+        if vectors_file.exists():
+            self._vectors = np.load(vectors_file, mmap_mode="r+")
+        else:
+            self._vectors = np.lib.format.open_memmap(
+                vectors_file, mode="w+", dtype=np.float32, shape=(_INITIAL_CAPACITY, dim)
+            )
+
+        log = path / "points.jsonl"
+        if log.exists():
+            with log.open(encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._set(entry["id"], entry["row"], entry["payload"])
+        self._log = log.open("a", encoding="utf-8")
+
+    @property
+    def count(self) -> int:
+        return len(self.payloads)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.count]
+
+    def _set(self, point_id: str, row: int, payload: dict) -> None:
+        self._rows[point_id] = row
+        if row == len(self.payloads):
+            self.payloads.append(payload)
+        else:
+            self.payloads[row] = payload
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        tmp = self._path / "vectors.tmp.npy"
+        grown = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=np.float32, shape=(capacity, self._dim)
+        )
+        grown[:self.count] = self._vectors[:self.count]
+        grown.flush()
+        del grown
+        self._vectors.flush()
+        tmp.replace(self._path / "vectors.npy")
+        self._vectors = np.load(self._path / "vectors.npy", mmap_mode="r+")
+
+    def upsert(self, ids: list[str], vectors: np.ndarray, payloads: list[dict]) -> None:
+        # An id repeated within the batch: the last occurrence wins (as in Qdrant)
+        last = {point_id: i for i, point_id in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids = [ids[i] for i in keep]
+            vectors = vectors[keep]
+            payloads = [payloads[i] for i in keep]
+        rows = []
+        next_row = self.count
+        for point_id in ids:
+            row = self._rows.get(point_id)
+            if row is None:
+                row, next_row = next_row, next_row + 1
+            rows.append(row)
+        self._grow(next_row)
+        self._vectors[rows] = vectors
+        self._vectors.flush()
+        for point_id, row, payload in zip(ids, rows, payloads):
+            self._set(point_id, row, payload)
+            self._log.write(json.dumps({"id": point_id, "row": row, "payload": payload}) + "\n")
+        self._log.flush()
+
+    def points(self) -> list[dict]:
+        return [
+            {"id": point_id, "vector": self._vectors[row].copy(), "payload": self.payloads[row]}
+            for point_id, row in self._rows.items()
+        ]
+
+    def remove(self, ids: set[str]) -> None:
+        """Drop points by rewriting the matrix and the log without them."""
+        kept = [(pid, row) for pid, row in self._rows.items() if pid not in ids]
+        if len(kept) == len(self._rows):
+            return
+        capacity = max(_INITIAL_CAPACITY, self._vectors.shape[0])
+        tmp_vectors = self._path / "vectors.tmp.npy"
+        tmp_log = self._path / "points.tmp.jsonl"
+        vectors = np.lib.format.open_memmap(
+            tmp_vectors, mode="w+", dtype=np.float32, shape=(capacity, self._dim)
+        )
+        with tmp_log.open("w", encoding="utf-8") as log:
+            for new_row, (point_id, row) in enumerate(kept):
+                vectors[new_row] = self._vectors[row]
+                log.write(json.dumps(
+                    {"id": point_id, "row": new_row, "payload": self.payloads[row]}
+                ) + "\n")
+        vectors.flush()
+        del vectors
+        payloads = [self.payloads[row] for _, row in kept]
+
+        self._log.close()
+        tmp_vectors.replace(self._path / "vectors.npy")
+        tmp_log.replace(self._path / "points.jsonl")
+        self._vectors = np.load(self._path / "vectors.npy", mmap_mode="r+")
+        self._log = (self._path / "points.jsonl").open("a", encoding="utf-8")
+        self._rows = {point_id: new_row for new_row, (point_id, _) in enumerate(kept)}
+        self.payloads = payloads
+
+    def close(self) -> None:
+        self._vectors.flush()
+        self._log.close()
+        self.closed = True
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+    if limit >= scores.shape[-1]:
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    return top[np.argsort(-scores[top])]
+
+
+class LocalVectorStore:
+    """In-process VectorStore backend for single-node and CI deployments.
+
+    Each user's memories are one contiguous float32 matrix, memory-mapped
+    from ``vector_local_dir/<collection>/<user_id>/``; search is a
+    brute-force cosine top-k (one matrix-vector product), which stays in
+    the low milliseconds up to tens of thousands of memories per user.
+    Same async interface as the Qdrant-backed ``VectorStore``; the numpy
+    and file work runs in the thread pool.
+    """
+
+    def __init__(self):
+        self._root: Path | None = None
+        self._users: OrderedDict[str, _UserIndex] = OrderedDict()
+        self._users_lock = threading.Lock()
+
+    async def connect(self) -> None:
+        """Called once during FastAPI lifespan startup."""
+        self._root = Path(settings.vector_local_dir) / settings.qdrant_collection_name
+        self._root.mkdir(parents=True, exist_ok=True)
+        logger.info("Local vector store at %s", self._root)
+
+    def _open(self, user_id: str) -> _UserIndex:
+        with self._users_lock:
+            index = self._users.get(user_id)
+            if index is None:
+                index = _UserIndex(self._root / user_id, settings.embedding_vector_dim)
+                self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > settings.vector_local_open_users:
+                _, evicted = self._users.popitem(last=False)
+                with evicted.lock:
+                    evicted.close()
+        return index
+
+    @contextmanager
+    def _user(self, user_id: str) -> Iterator[_UserIndex]:
+        """Lock a user's index (reopening it if it was evicted meanwhile)."""
+        while True:
+            index = self._open(user_id)
+            with index.lock:
+                if not index.closed:
+                    yield index
+                    return
+
+    def _upsert_sync(
+        self, vector_ids: list[str], embeddings: list[list[float]], payloads: list[dict]
+    ) -> None:
+        by_user: dict[str, list[int]] = {}
+        for i, payload in enumerate(payloads):
+            by_user.setdefault(payload["user_id"], []).append(i)
+        matrix = _normalize(np.asarray(embeddings, dtype=np.float32))
+        for user_id, positions in by_user.items():
+            with self._user(user_id) as index:
+                index.upsert(
+                    [vector_ids[i] for i in positions],
+                    matrix[positions],
+                    [payloads[i] for i in positions],
+                )
+
+    def _search_sync(
+        self, embeddings: list[list[float]], user_id: str, limit: int
+    ) -> list[list[dict]]:
+        if not (self._root / user_id).exists():
+            return [[] for _ in embeddings]
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._user(user_id) as index:
+            all_scores = queries @ index.vectors.T
+            results = []
+            for scores in all_scores:
+                results.append([
+                    {"text": index.payloads[row].get("text", ""), "score": float(scores[row])}
+                    for row in _top_k(scores, limit)
+                ])
+        return results
+
+    async def upsert(self, vector_id: str, embedding: list[float], payload: dict) -> None:
+        await asyncio.to_thread(self._upsert_sync, [vector_id], [embedding], [payload])
+
+    async def upsert_many(
+        self,
+        vector_ids: list[str],
+        embeddings: list[list[float]],
+        payloads: list[dict],
+        batch_size: int | None = None,
+        parallel: int | None = None,
+    ) -> None:
+        if vector_ids:
+            await asyncio.to_thread(self._upsert_sync, vector_ids, embeddings, payloads)
+
+    async def search(
+        self, embedding: list[float], user_id: str, limit: int | None = None
+    ) -> list[dict]:
+        return (await self.search_many([embedding], user_id, limit))[0]
+
+    async def search_many(
+        self, embeddings: list[list[float]], user_id: str, limit: int | None = None
+    ) -> list[list[dict]]:
+        if limit is None:
+            limit = settings.memory_recall_limit
+        if not embeddings:
+            return []
+        return await asyncio.to_thread(self._search_sync, embeddings, user_id, limit)
+
+    def _scroll_sync(self, user_id: str) -> list[dict]:
+        if not (self._root / user_id).exists():
+            return []
+        with self._user(user_id) as index:
+            return index.points()
+
+    def _delete_sync(self, user_id: str, vector_ids: list[str]) -> None:
+        with self._user(user_id) as index:
+            index.remove(set(vector_ids))
+
+    async def scroll_user(self, user_id: str) -> list[dict]:
+        return await asyncio.to_thread(self._scroll_sync, user_id)
+
+    async def delete(self, user_id: str, vector_ids: list[str]) -> None:
+        if vector_ids:
+            await asyncio.to_thread(self._delete_sync, user_id, vector_ids)
+
+    async def close(self) -> None:
+        with self._users_lock:
+            for index in self._users.values():
+                with index.lock:
+                    index.close()
+            self._users.clear()
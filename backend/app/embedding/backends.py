@@ -0,0 +1,63 @@
+import logging
+from collections.abc import Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Texts pushed through the model at startup so the first user request
+# doesn't pay for lazy initialisation (kernels, allocator, tokenizer)
+WARMUP_TEXTS = [
+    "hello",
+    "What did we talk about yesterday?",
+    "Remember that my sister's name is Claire and she lives in Lyon.",
+] * 4
+
+
+def _load_torch(model_name: str):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def _load_onnx(model_name: str):
+    """Quantized ONNX Runtime model on CPU (needs ``requirements-onnx.txt``).
+
+    The sentence-transformers hub repos ship pre-quantized int8 exports, e.g.
+    ``onnx/model_quint8_avx2.onnx`` for all-MiniLM-L6-v2.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(
+        model_name,
+        backend="onnx",
+        device="cpu",
+        model_kwargs={
+            "file_name": settings.embedding_onnx_file,
+            "provider": "CPUExecutionProvider",
+        },
+    )
+
+
+_BACKENDS: dict[str, Callable] = {
+    "torch": _load_torch,
+    "onnx": _load_onnx,
+}
+
+
+def load_model(backend: str | None = None, model_name: str | None = None):
+    """Instantiate the embedding model for the configured backend.
+
+    Every backend returns an object with a SentenceTransformer-compatible
+    ``encode(texts, normalize_embeddings=True)``.
+    """
+    backend = backend or settings.embedding_backend
+    model_name = model_name or settings.embedding_model_name
+    if backend not in _BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend {backend!r} (expected one of {sorted(_BACKENDS)})"
+        )
+    logger.info("Loading embedding model %s (backend=%s)...", model_name, backend)
+    model = _BACKENDS[backend](model_name)
+    logger.info("Embedding model loaded")
+    return model
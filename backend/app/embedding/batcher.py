@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from app.core import background_tasks
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embed calls into batched encodes.
+
+    Requests are collected for up to ``embedding_batch_max_wait_ms`` (or
+    until ``embedding_batch_max_size`` are waiting), then encoded in one
+    forward pass; each caller gets its own vector back. Up to
+    ``concurrency()`` batches are encoded at once (read on first use, after
+    startup): 1 for the in-process model, more when a worker pool can run
+    several batches in parallel.
+    """
+
+    def __init__(self, encode: EncodeFn, concurrency: Callable[[], int] = lambda: 1):
+        self._encode = encode
+        self._concurrency = concurrency
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(self._concurrency(), 1))
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= settings.embedding_batch_max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(
+                settings.embedding_batch_max_wait_ms / 1000, self._flush
+            )
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            background_tasks.spawn(self._run(batch))
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        async with self._slots:
+            # Callers that gave up while queued don't need encoding
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                return
+            start = time.time()
+            try:
+                vectors = await self._encode([text for text, _ in batch])
+            except Exception as e:
+                logger.error("Embedding batch of %d failed: %s", len(batch), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            metrics.incr("embedding.batches")
+            metrics.observe("embedding.batch_size", len(batch))
+            metrics.observe("embedding.batch_ms", (time.time() - start) * 1000)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys.
+
+    Case is folded too: MiniLM's tokenizer lowercases its input, so "What's
+    my name" and "what's my name" embed identically.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def cache_key(text: str, model_id: str) -> bytes:
+    return hashlib.blake2b(
+        f"{model_id}\x00{normalize_text(text)}".encode(), digest_size=16
+    ).digest()
+
+
+class _DiskTier:
+    """SQLite table of key -> float32 bytes, so entries survive restarts."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key: bytes) -> np.ndarray | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+
+    def put_many(self, items: list[tuple[bytes, np.ndarray]]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.astype(np.float32).tobytes()) for key, vector in items],
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class EmbeddingCache:
+    """Bounded LRU of embeddings keyed by hash(model id + normalized text).
+
+    Vectors live in one preallocated float32 matrix (``size`` x dim); the LRU
+    only maps keys to row numbers, and an evicted entry's row is reused.
+    The model id is part of every key, so switching model or backend never
+    serves stale vectors. With ``embedding_cache_dir`` set, misses fall back
+    to a SQLite tier on disk before hitting the model.
+    """
+
+    def __init__(self, size: int, dim: int, model_id: str, disk_dir: str = ""):
+        self._size = size
+        self._model_id = model_id
+        self._lock = threading.Lock()
+        self._slots: OrderedDict[bytes, int] = OrderedDict()
+        self._vectors = np.zeros((size, dim), dtype=np.float32)
+        self._disk: _DiskTier | None = None
+        if disk_dir:
+            self._disk = _DiskTier(Path(disk_dir) / "embeddings.sqlite3")
+
+    @property
+    def enabled(self) -> bool:
+        return self._size > 0
+
+    def key(self, text: str) -> bytes:
+        return cache_key(text, self._model_id)
+
+    def get_many(self, keys: list[bytes]) -> list[np.ndarray | None]:
+        """Vectors for ``keys`` (None on miss). May touch disk — call off-loop."""
+        found: list[np.ndarray | None] = []
+        with self._lock:
+            for key in keys:
+                slot = self._slots.get(key)
+                if slot is None:
+                    found.append(None)
+                    continue
+                self._slots.move_to_end(key)
+                found.append(self._vectors[slot].copy())
+
+        hits = sum(v is not None for v in found)
+        if self._disk and hits < len(keys):
+            promoted = []
+            for i, key in enumerate(keys):
+                if found[i] is None and (vector := self._disk.get(key)) is not None:
+                    found[i] = vector
+                    promoted.append((key, vector))
+            if promoted:
+                metrics.incr("embedding.cache.disk_hits", len(promoted))
+                self._put_memory(promoted)
+            hits += len(promoted)
+
+        metrics.incr("embedding.cache.hits", hits)
+        metrics.incr("embedding.cache.misses", len(keys) - hits)
+        return found
+
+    def put_many(self, items: list[tuple[bytes, np.ndarray]]) -> None:
+        self._put_memory(items)
+        if self._disk:
+            self._disk.put_many(items)
+
+    def _put_memory(self, items: list[tuple[bytes, np.ndarray]]) -> None:
+        with self._lock:
+            for key, vector in items:
+                slot = self._slots.get(key)
+                if slot is None:
+                    if len(self._slots) < self._size:
+                        slot = len(self._slots)
+                    else:
+                        _, slot = self._slots.popitem(last=False)
+                        metrics.incr("embedding.cache.evictions")
+                self._slots[key] = slot
+                self._slots.move_to_end(key)
+                self._vectors[slot] = vector
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def close(self) -> None:
+        if self._disk:
+            self._disk.close()
+
+
+embedding_cache = EmbeddingCache(
+    size=settings.embedding_cache_size,
+    dim=settings.embedding_vector_dim,
+    model_id=f"{settings.embedding_backend}:{settings.embedding_model_name}",
+    disk_dir=settings.embedding_cache_dir,
+)
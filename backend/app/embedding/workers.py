@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# -- worker-process side ------------------------------------------------------
+# Kept free of heavy imports: workers are spawned fresh and only load the
+# embedding model (once, in the initializer).
+
+_worker_model = None
+
+
+def _init_worker(backend: str, model_name: str) -> None:
+    global _worker_model
+    from app.embedding.backends import load_model
+
+    _worker_model = load_model(backend, model_name)
+
+
+def _encode_in_worker(texts: list[str]) -> np.ndarray:
+    # A contiguous float32 array pickles as one raw buffer, not 384 floats each
+    return np.ascontiguousarray(
+        _worker_model.encode(texts, normalize_embeddings=True), dtype=np.float32
+    )
+
+
+# -- event-loop side ----------------------------------------------------------
+
+
+class EmbeddingWorkerPool:
+    """Runs embedding in dedicated processes so MiniLM never holds the
+    uvicorn worker's GIL while tokens are streaming.
+
+    In-flight batches are capped (callers wait for a slot), and a pool whose
+    worker died is rebuilt and the batch retried once.
+    """
+
+    def __init__(self):
+        self._executor: ProcessPoolExecutor | None = None
+        self._inflight: asyncio.Semaphore | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=settings.embedding_worker_processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.embedding_backend, settings.embedding_model_name),
+        )
+
+    def start(self) -> None:
+        """Called once during FastAPI lifespan startup."""
+        if settings.embedding_worker_processes <= 0 or self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        self._inflight = asyncio.Semaphore(settings.embedding_worker_max_inflight)
+        logger.info(
+            "Embedding worker pool started (%d processes)",
+            settings.embedding_worker_processes,
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        if self._executor is not broken:
+            return  # another caller already replaced it
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._create_executor()
+        metrics.incr("embedding.worker_restarts")
+        logger.warning("Embedding worker crashed, pool restarted")
+
+    async def encode(self, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        async with self._inflight:
+            for attempt in range(2):
+                executor = self._executor
+                try:
+                    vectors = await loop.run_in_executor(executor, _encode_in_worker, texts)
+                    return vectors.tolist()
+                except BrokenProcessPool:
+                    self._restart(executor)
+                    if attempt:
+                        raise
+
+    def close(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+embedding_workers = EmbeddingWorkerPool()
@@ -85,6 +85,25 @@ class ComfyUIClient:
             f"ComfyUI Cloud job {prompt_id} did not complete in {settings.comfyui_poll_timeout}s"
         )
 
+    async def cancel(self, prompt_id: str) -> None:
+        """Best-effort cancel: drop the prompt from the queue, or interrupt it if running."""
+        async with httpx.AsyncClient() as client:
+            for path, payload in (
+                ("/api/queue", {"delete": [prompt_id]}),
+                ("/api/interrupt", {"prompt_id": prompt_id}),
+            ):
+                try:
+                    response = await client.post(
+                        f"{self._base_url}{path}",
+                        json=payload,
+                        headers=self._headers(),
+                        timeout=settings.comfyui_request_timeout,
+                    )
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    logger.warning("Cancel of job %s via %s failed: %s", prompt_id, path, e)
+        logger.info("Job %s cancelled", prompt_id)
+
     async def _fetch_history(self, prompt_id: str) -> dict:
         """Fetch the full history entry for a completed job."""
         async with httpx.AsyncClient() as client:
@@ -120,7 +139,11 @@ class ComfyUIClient:
         Returns list of {"bytes": bytes, "filename": str} dicts.
         """
         prompt_id = await self.submit_workflow(workflow)
-        result = await self.poll_result(prompt_id)
+        try:
+            result = await self.poll_result(prompt_id)
+        except asyncio.CancelledError:
+            await self.cancel(prompt_id)
+            raise
 
         images: list[dict] = []
         # history_v2 wraps the result under a prompt_id key:
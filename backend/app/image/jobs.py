@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import logging
+import uuid
+from collections.abc import Awaitable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.postgres import async_session
+from app.models.session import Message
+
+logger = logging.getLogger(__name__)
+
+IMAGES_DIR = Path(__file__).parent.parent.parent / "uploads" / "images"
+IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+
+JOB_PENDING = "pending"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+def save_images_to_disk(base64_images: list[str], msg_id: uuid.UUID) -> list[str]:
+    """Save base64 images to disk, return list of URL paths."""
+    urls = []
+    for i, b64 in enumerate(base64_images):
+        filename = f"{msg_id}_{i}.png"
+        filepath = IMAGES_DIR / filename
+        filepath.write_bytes(base64.b64decode(b64))
+        urls.append(f"/uploads/images/{filename}")
+        logger.info("Saved image: %s", filename)
+    return urls
+
+
+@dataclass
+class ImageJob:
+    message_id: uuid.UUID
+    user_id: uuid.UUID
+    status: str = JOB_PENDING
+    image_urls: list[str] | None = None
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+    persisted: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+
+
+class ImageJobManager:
+    """Runs image generations in the background, keyed by assistant message.
+
+    A job outlives the SSE stream that started it: the message row is saved
+    with ``image_status`` "pending", and once the job ends its outcome is
+    written to ``Message.image_urls`` / ``image_status``, so a client that
+    went away can pick the images up from GET /chat/messages/{id}/images
+    (served by any API worker) or the history.
+    """
+
+    def __init__(self):
+        self._jobs: dict[uuid.UUID, ImageJob] = {}
+
+    def submit(
+        self,
+        message_id: uuid.UUID,
+        user_id: uuid.UUID,
+        generation: Awaitable[list[str] | None],
+    ) -> ImageJob:
+        job = ImageJob(message_id=message_id, user_id=user_id)
+        job.task = asyncio.create_task(self._run(job, generation))
+        self._jobs[message_id] = job
+        metrics.incr("image_jobs.submitted")
+        return job
+
+    def get(self, message_id: uuid.UUID) -> ImageJob | None:
+        return self._jobs.get(message_id)
+
+    def cancel(self, message_id: uuid.UUID) -> None:
+        """Abandon a still-running job (its ComfyUI prompt is cancelled too)."""
+        job = self._jobs.get(message_id)
+        if job and job.task and not job.finished.is_set():
+            job.task.cancel()
+
+    def status(self, message_id: uuid.UUID) -> str | None:
+        """Value for ``Message.image_status`` when the message is saved."""
+        job = self._jobs.get(message_id)
+        return job.status if job else None
+
+    def mark_persisted(self, message_id: uuid.UUID) -> None:
+        """Called by the chat route once the assistant message row exists."""
+        job = self._jobs.get(message_id)
+        if job:
+            job.persisted.set()
+
+    async def _run(self, job: ImageJob, generation: Awaitable[list[str] | None]) -> None:
+        user_id_short = str(job.user_id)[:8]
+        try:
+            images = await generation
+            if images:
+                job.image_urls = save_images_to_disk(images, job.message_id)
+            job.status = JOB_DONE if job.image_urls else JOB_FAILED
+        except asyncio.CancelledError:
+            job.status = JOB_CANCELLED
+            logger.info("[user:%s] image job cancelled", user_id_short)
+        except Exception as e:
+            job.status = JOB_FAILED
+            logger.warning("[user:%s] image job failed: %s", user_id_short, e)
+        finally:
+            job.finished.set()
+            metrics.incr(f"image_jobs.{job.status}")
+            asyncio.get_running_loop().call_later(
+                settings.image_job_retention_seconds, self._jobs.pop, job.message_id, None
+            )
+
+        await self._persist(job, user_id_short)
+
+    async def _persist(self, job: ImageJob, user_id_short: str) -> None:
+        try:
+            await asyncio.wait_for(
+                job.persisted.wait(), settings.image_job_persist_timeout
+            )
+        except TimeoutError:
+            logger.warning(
+                "[user:%s] message %s never persisted, image job outcome not saved",
+                user_id_short, job.message_id,
+            )
+            return
+
+        async with async_session() as db:
+            await db.execute(
+                update(Message)
+                .where(Message.id == job.message_id)
+                .values(image_urls=job.image_urls, image_status=job.status)
+            )
+            await db.commit()
+        logger.info(
+            "[user:%s] image job %s saved for message %s",
+            user_id_short, job.status, job.message_id,
+        )
+
+
+image_jobs = ImageJobManager()
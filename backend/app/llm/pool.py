@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    NotFoundError,
+)
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_OLLAMA_API_KEY = "ollama"  # dummy key required by OpenAI SDK for local Ollama
+
+# Errors that mean "this box can't serve it" — try another endpoint
+_FAILOVER_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, NotFoundError)
+# Subset that counts against the endpoint's health (a 404 is just a missing model)
+_HEALTH_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class NoHealthyEndpointError(RuntimeError):
+    pass
+
+
+def model_key(model: str) -> str:
+    """Ollama reports "mistral" as "mistral:latest" — compare on the full tag."""
+    return model if ":" in model else f"{model}:latest"
+
+
+@dataclass(eq=False)
+class Endpoint:
+    base_url: str
+    client: AsyncOpenAI
+    outstanding: int = 0
+    healthy: bool = True
+    consecutive_failures: int = 0
+    unhealthy_until: float = 0.0
+    loaded_models: set[str] = field(default_factory=set)
+    # Smallest context window /api/ps reports for the loaded models
+    context_length: int | None = None
+
+    @property
+    def native_url(self) -> str:
+        """Ollama's own API root (the OpenAI-compatible one lives under /v1)."""
+        return self.base_url.rstrip("/").removesuffix("/v1")
+
+    def is_available(self, now: float) -> bool:
+        # Unhealthy endpoints get a trial request again once the cooldown ends
+        return self.healthy or now >= self.unhealthy_until
+
+
+class LLMPool:
+    """Pool of Ollama endpoints shared by every LLM caller.
+
+    Routing: healthy endpoints that already have the model loaded win (unless
+    they are saturated), then least outstanding requests. Health is tracked
+    passively (consecutive request failures) and actively (periodic
+    ``/api/ps``, which also refreshes the loaded-model affinity). A request
+    that fails on one endpoint is retried on the next; streams fail over as
+    long as no token has been delivered yet.
+
+    With ``ollama_session_affinity``, requests carrying an ``affinity_key``
+    (a user or session id) go back to the endpoint that served that key's
+    previous turn, where Ollama still holds the KV cache for the shared
+    prompt prefix — only the new tokens then need evaluating.
+    """
+
+    def __init__(self):
+        self._endpoints: list[Endpoint] = [
+            Endpoint(
+                base_url=url,
+                client=AsyncOpenAI(base_url=url, api_key=_OLLAMA_API_KEY),
+            )
+            for url in (settings.ollama_endpoints or [settings.ollama_base_url])
+        ]
+        self._health_task: asyncio.Task | None = None
+        self._sticky: OrderedDict[tuple[str, str], Endpoint] = OrderedDict()
+
+    @property
+    def endpoints(self) -> list[Endpoint]:
+        return self._endpoints
+
+    # -- routing --------------------------------------------------------------
+
+    def _pick(
+        self, model: str, exclude: set[Endpoint], affinity_key: str | None = None
+    ) -> Endpoint | None:
+        now = time.monotonic()
+        candidates = [
+            e for e in self._endpoints if e not in exclude and e.is_available(now)
+        ]
+        if not candidates:
+            return None
+        key = model_key(model)
+
+        sticky = self._sticky.get((affinity_key, key)) if affinity_key else None
+        if (
+            sticky in candidates
+            and sticky.healthy
+            and sticky.outstanding < settings.ollama_affinity_max_outstanding
+        ):
+            metrics.incr("llm_pool.sticky_hits")
+            return sticky
+        warm = [
+            e for e in candidates
+            if key in e.loaded_models
+            and e.outstanding < settings.ollama_affinity_max_outstanding
+        ]
+        return min(warm or candidates, key=lambda e: (not e.healthy, e.outstanding))
+
+    def context_window(self) -> int:
+        """Tokens a prompt plus its reply can use on any endpoint: the
+        configured server window, or a smaller one Ollama reports."""
+        reported = [e.context_length for e in self._endpoints if e.context_length]
+        return min([settings.ollama_context_length, *reported])
+
+    def is_resident(self, model: str) -> bool:
+        """Whether any available endpoint currently has ``model`` loaded."""
+        now = time.monotonic()
+        key = model_key(model)
+        return any(
+            key in e.loaded_models for e in self._endpoints if e.is_available(now)
+        )
+
+    def _remember_affinity(self, affinity_key: str | None, model: str, endpoint: Endpoint) -> None:
+        if not affinity_key or not settings.ollama_session_affinity:
+            return
+        self._sticky[(affinity_key, model_key(model))] = endpoint
+        self._sticky.move_to_end((affinity_key, model_key(model)))
+        while len(self._sticky) > settings.ollama_session_affinity_size:
+            self._sticky.popitem(last=False)
+
+    def _record_success(self, endpoint: Endpoint, model: str) -> None:
+        if not endpoint.healthy:
+            logger.info("LLM endpoint %s recovered", endpoint.base_url)
+        endpoint.healthy = True
+        endpoint.consecutive_failures = 0
+        key = model_key(model)
+        if key not in endpoint.loaded_models:
+            # Served by a box that didn't have it loaded: Ollama had to load it
+            metrics.incr("llm.cold_requests")
+            metrics.incr(f"llm.model_loads.{key}")
+            endpoint.loaded_models.add(key)
+
+    def _record_failure(self, endpoint: Endpoint, error: Exception) -> None:
+        metrics.incr("llm_pool.failures")
+        if not isinstance(error, _HEALTH_ERRORS):
+            return
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= settings.ollama_endpoint_failure_threshold:
+            self._mark_unhealthy(endpoint, f"{endpoint.consecutive_failures} failures: {error}")
+
+    def _mark_unhealthy(self, endpoint: Endpoint, reason: str) -> None:
+        if endpoint.healthy:
+            logger.warning("LLM endpoint %s unhealthy (%s)", endpoint.base_url, reason)
+        endpoint.healthy = False
+        endpoint.unhealthy_until = time.monotonic() + settings.ollama_endpoint_cooldown
+
+    # -- requests -------------------------------------------------------------
+
+    async def chat(self, model: str, affinity_key: str | None = None, **kwargs):
+        """Non-streaming chat completion with failover across endpoints."""
+        tried: set[Endpoint] = set()
+        last_error: Exception | None = None
+        while (endpoint := self._pick(model, tried, affinity_key)) is not None:
+            tried.add(endpoint)
+            endpoint.outstanding += 1
+            try:
+                response = await endpoint.client.chat.completions.create(
+                    model=model, stream=False, **kwargs
+                )
+            except _FAILOVER_ERRORS as e:
+                self._record_failure(endpoint, e)
+                last_error = e
+                metrics.incr("llm_pool.failovers")
+                logger.warning("LLM endpoint %s failed for %s: %s", endpoint.base_url, model, e)
+                continue
+            finally:
+                endpoint.outstanding -= 1
+            self._record_success(endpoint, model)
+            self._remember_affinity(affinity_key, model, endpoint)
+            return response
+        raise NoHealthyEndpointError(f"No LLM endpoint could serve {model}") from last_error
+
+    async def stream_chat(
+        self, model: str, affinity_key: str | None = None, **kwargs
+    ) -> AsyncIterator:
+        """Streaming chat completion; fails over until the first chunk arrives."""
+        tried: set[Endpoint] = set()
+        last_error: Exception | None = None
+        while (endpoint := self._pick(model, tried, affinity_key)) is not None:
+            tried.add(endpoint)
+            endpoint.outstanding += 1
+            started = False
+            try:
+                stream = await endpoint.client.chat.completions.create(
+                    model=model, stream=True, **kwargs
+                )
+                try:
+                    async for chunk in stream:
+                        started = True
+                        yield chunk
+                finally:
+                    # Closing the HTTP response is what makes Ollama stop
+                    # generating when the consumer goes away early
+                    await asyncio.shield(stream.close())
+            except _FAILOVER_ERRORS as e:
+                self._record_failure(endpoint, e)
+                if started:
+                    raise
+                last_error = e
+                metrics.incr("llm_pool.failovers")
+                logger.warning("LLM endpoint %s failed for %s: %s", endpoint.base_url, model, e)
+                continue
+            finally:
+                endpoint.outstanding -= 1
+            self._record_success(endpoint, model)
+            self._remember_affinity(affinity_key, model, endpoint)
+            return
+        raise NoHealthyEndpointError(f"No LLM endpoint could serve {model}") from last_error
+
+    # -- active health checks -------------------------------------------------
+
+    async def check_health(self) -> None:
+        """Probe every endpoint's /api/ps once (also refreshes loaded models)."""
+        async with httpx.AsyncClient(timeout=settings.ollama_health_check_timeout) as client:
+            await asyncio.gather(*(self._probe(client, e) for e in self._endpoints))
+
+    async def _probe(self, client: httpx.AsyncClient, endpoint: Endpoint) -> None:
+        try:
+            response = await client.get(f"{endpoint.native_url}/api/ps")
+            response.raise_for_status()
+            models = response.json().get("models", [])
+        except Exception as e:
+            self._mark_unhealthy(endpoint, f"health check: {e}")
+            return
+        loaded = {model_key(m["name"]) for m in models if "name" in m}
+        for key in loaded - endpoint.loaded_models:
+            metrics.incr(f"llm.model_loads.{key}")
+        for key in endpoint.loaded_models - loaded:
+            metrics.incr(f"llm.model_unloads.{key}")
+        endpoint.loaded_models = loaded
+        windows = [m["context_length"] for m in models if m.get("context_length")]
+        endpoint.context_length = min(windows) if windows else None
+        if not endpoint.healthy:
+            logger.info("LLM endpoint %s recovered", endpoint.base_url)
+        endpoint.healthy = True
+        endpoint.consecutive_failures = 0
+
+    async def _health_loop(self) -> None:
+        while True:
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error("LLM health check loop failed: %s", e)
+            await asyncio.sleep(settings.ollama_health_check_interval)
+
+    def start(self) -> None:
+        """Called once during FastAPI lifespan startup."""
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        for endpoint in self._endpoints:
+            await endpoint.client.close()
+
+
+llm_pool = LLMPool()
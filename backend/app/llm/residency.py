@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.llm.pool import Endpoint, LLMPool, llm_pool, model_key
+
+logger = logging.getLogger(__name__)
+
+
+def stage_models() -> list[str]:
+    """Every model a chat turn can touch, in the order they are used."""
+    models = [
+        settings.ollama_supervisor_model,
+        settings.ollama_chat_model,
+        settings.ollama_her_model,
+        settings.prompt_rewriter_model,
+    ]
+    if settings.summary_enabled:
+        models.append(settings.summary_model)
+    if settings.profile_enabled:
+        models.append(settings.profile_model)
+    return list(dict.fromkeys(models))
+
+
+class ModelResidency:
+    """Keeps the pipeline's models warm in Ollama and avoids needless swaps.
+
+    - ``preload`` loads every stage model at startup; how long they then
+      stay resident is the server's ``OLLAMA_KEEP_ALIVE`` (the OpenAI-compatible
+      endpoint the pool talks to ignores a per-request ``keep_alive``)
+    - residency itself is tracked by the pool (``/api/ps`` probes + requests)
+    - ``resolve`` optionally swaps a cold model for a configured, smaller
+      fallback that is already resident, instead of forcing a load
+    """
+
+    def __init__(self, pool: LLMPool):
+        self._pool = pool
+        self._preload_task: asyncio.Task | None = None
+
+    def resolve(self, model: str) -> str:
+        if not settings.ollama_prefer_resident or self._pool.is_resident(model):
+            return model
+        fallback = settings.ollama_resident_fallbacks.get(model)
+        if fallback and self._pool.is_resident(fallback):
+            metrics.incr("llm.resident_substitutions")
+            logger.info("Model %s not resident, using resident %s", model, fallback)
+            return fallback
+        return model
+
+    def resident_models(self) -> dict[str, list[str]]:
+        return {e.base_url: sorted(e.loaded_models) for e in self._pool.endpoints}
+
+    async def preload(self) -> None:
+        models = stage_models()
+        async with httpx.AsyncClient(timeout=settings.ollama_preload_timeout) as client:
+            # Endpoints in parallel, models one at a time per box (one GPU each)
+            await asyncio.gather(*(
+                self._preload_endpoint(client, endpoint, models)
+                for endpoint in self._pool.endpoints
+            ))
+
+    async def _preload_endpoint(
+        self, client: httpx.AsyncClient, endpoint: Endpoint, models: list[str]
+    ) -> None:
+        for model in models:
+            start = time.time()
+            try:
+                # An empty prompt makes Ollama load the model and return. No
+                # options: the model must load exactly as the /v1 requests
+                # (which can't pass any) will want it, or the first one reloads it
+                response = await client.post(
+                    f"{endpoint.native_url}/api/generate", json={"model": model}
+                )
+                response.raise_for_status()
+                load_seconds = response.json().get("load_duration", 0) / 1e9
+            except Exception as e:
+                logger.warning("Preload of %s on %s failed: %s", model, endpoint.base_url, e)
+                continue
+            endpoint.loaded_models.add(model_key(model))
+            metrics.incr(f"llm.model_loads.{model_key(model)}")
+            metrics.observe("llm.model_load_seconds", load_seconds)
+            logger.info(
+                "Preloaded %s on %s (load %.1fs, total %.1fs)",
+                model, endpoint.base_url, load_seconds, time.time() - start,
+            )
+
+    def start(self) -> None:
+        """Called once during FastAPI lifespan startup; preloads in the background."""
+        if settings.ollama_preload_models and self._preload_task is None:
+            self._preload_task = asyncio.create_task(self.preload())
+
+    def close(self) -> None:
+        if self._preload_task:
+            self._preload_task.cancel()
+            self._preload_task = None
+
+
+model_residency = ModelResidency(llm_pool)
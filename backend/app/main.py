@@ -3,6 +3,7 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
@@ -12,16 +13,37 @@ logging.basicConfig(
     format="%(levelname)-5s %(name)s: %(message)s",
 )
 
+from app.core import background_tasks
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.api.v1 import auth, chat, image, onboarding
 from app.db.vector import vector_store
+from app.embedding.cache import embedding_cache
+from app.embedding.workers import embedding_workers
+from app.llm.pool import llm_pool
+from app.llm.residency import model_residency
+from app.orchestrator import memory
+from app.orchestrator.compaction import memory_compactor
+from app.orchestrator.memory_queue import memory_ingest
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    vector_store.connect()
+    await vector_store.connect()
+    embedding_workers.start()
+    background_tasks.spawn(memory.warmup())
+    llm_pool.start()
+    model_residency.start()
+    memory_ingest.start()
+    memory_compactor.start()
     yield
-    vector_store.close()
+    memory_compactor.close()
+    await memory_ingest.close()
+    model_residency.close()
+    await llm_pool.close()
+    embedding_workers.close()
+    embedding_cache.close()
+    await vector_store.close()
 
 
 app = FastAPI(title="AVA", version="0.1.0", lifespan=lifespan)
@@ -48,3 +70,15 @@ app.mount("/uploads", StaticFiles(directory=str(_UPLOADS_DIR)), name="uploads")
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    if not memory.is_ready():
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return {**metrics.snapshot(), "resident_models": model_residency.resident_models()}
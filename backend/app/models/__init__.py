@@ -1,4 +1,6 @@
 from app.models.user import User
 from app.models.session import Session, Message
+from app.models.memory_queue import MemoryIngestJob
+from app.models.maintenance import MaintenanceRun
 
-__all__ = ["User", "Session", "Message"]
+__all__ = ["User", "Session", "Message", "MemoryIngestJob", "MaintenanceRun"]
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.postgres import Base
+
+
+class MaintenanceRun(Base):
+    """When a periodic background job last finished, shared by all workers.
+
+    Lets a job that runs every few hours catch up after restarts instead of
+    restarting its interval with the process.
+    """
+
+    __tablename__ = "maintenance_runs"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    finished_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
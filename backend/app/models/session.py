@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, func
+from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, Index, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -23,6 +23,9 @@ class Session(Base):
     ended_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     mode_at_close: Mapped[str | None] = mapped_column(String(20))
     message_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Rolling summary of the messages older than the live window
+    summary: Mapped[str | None] = mapped_column(Text)
+    summary_message_count: Mapped[int] = mapped_column(Integer, default=0)
 
 
 class Message(Base):
@@ -46,4 +49,14 @@ class Message(Base):
         DateTime(timezone=True), server_default=func.now()
     )
     image_urls: Mapped[list | None] = mapped_column(JSONB)
+    # Image job state (app.image.jobs JOB_*), so any API worker can answer
+    # GET /chat/messages/{id}/images; None when no image was requested
+    image_status: Mapped[str | None] = mapped_column(String(20))
     vector_id: Mapped[str | None] = mapped_column(String(255))
+
+
+# Newest-first reads: the prompt history and /chat/history (per session and
+# per user) and /chat/sessions
+Index("ix_messages_session_id_created_at", Message.session_id, Message.created_at.desc())
+Index("ix_messages_user_id_created_at", Message.user_id, Message.created_at.desc())
+Index("ix_sessions_user_id_started_at", Session.user_id, Session.started_at.desc())
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import String, Boolean, Integer, DateTime, func
+from sqlalchemy import String, Boolean, Integer, Text, DateTime, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -28,3 +28,6 @@ class User(Base):
         DateTime(timezone=True), server_default=func.now()
     )
     last_active_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # Stable facts about the user, kept in every system prompt (see orchestrator/profile.py)
+    profile_card: Mapped[str | None] = mapped_column(Text)
+    profile_updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
@@ -1,17 +1,24 @@
+import asyncio
 import base64
 import json
 import logging
 import time
+import uuid
 from collections.abc import AsyncIterator
+from contextlib import aclosing
 from pathlib import Path
 
-from openai import AsyncOpenAI
-
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.image.generator import image_generator
+from app.image.jobs import ImageJob, image_jobs
 from app.image.prompt_rewriter import rewrite_prompt
+from app.llm.pool import llm_pool
+from app.llm.residency import model_residency
 from app.models.user import User
-from app.orchestrator.memory import recall, recall_as_tool
+from app.orchestrator.context import build_context
+from app.orchestrator.intent_router import INTENT_IMAGE, INTENT_RECALL, intent_router
+from app.orchestrator.memory import recall, recall_many
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +26,8 @@ logger = logging.getLogger(__name__)
 # Constants
 # ---------------------------------------------------------------------------
 
-_SENTINEL_IMAGE_REQUEST = "__IMAGE_REQUEST__"
 _ERROR_RESPONSE = "I'm having trouble responding right now. Please try again."
-_OLLAMA_API_KEY = "ollama"  # dummy key required by OpenAI SDK for local Ollama
+_SPECULATIVE_DONE = object()  # end-of-stream marker in the speculative buffer
 
 # ---------------------------------------------------------------------------
 # System prompts — loaded from txt files for easy editing
@@ -58,40 +64,48 @@ ALL_TOOLS = [TOOL_RECALL_MEMORIES, TOOL_GENERATE_IMAGE]
 _TOOL_NAME_RECALL = TOOL_RECALL_MEMORIES["function"]["name"]
 _TOOL_NAME_IMAGE = TOOL_GENERATE_IMAGE["function"]["name"]
 
-# ---------------------------------------------------------------------------
-# OpenAI client (pointed at Ollama)
-# ---------------------------------------------------------------------------
-
-_client = AsyncOpenAI(
-    base_url=settings.ollama_base_url,
-    api_key=_OLLAMA_API_KEY,
-)
 
 # ---------------------------------------------------------------------------
 # Tool dispatcher
 # ---------------------------------------------------------------------------
 
 
-async def _dispatch_tool(
-    tool_name: str, arguments: dict, user: User
-) -> str:
-    """Execute a tool call and return the result as a string."""
+async def _recall_many(queries: list[str], user: User) -> list[list[str]]:
+    """Every recall_memories call of a turn in one batched lookup."""
     start = time.time()
-
-    if tool_name == _TOOL_NAME_RECALL:
-        query = arguments.get("query", "")
-        result = await recall_as_tool(user_id=str(user.id), query=query)
-    elif tool_name == _TOOL_NAME_IMAGE:
-        result = _SENTINEL_IMAGE_REQUEST
-    else:
-        result = f"Unknown tool: {tool_name}"
-
-    elapsed = (time.time() - start) * 1000
+    results = await recall_many(user_id=str(user.id), queries=queries)
     logger.info(
-        "[user:%s] tool_call: %s(%s) took %.0fms",
-        str(user.id)[:8], tool_name, json.dumps(arguments)[:80], elapsed,
+        "[user:%s] tool_call: %s x%d took %.0fms",
+        str(user.id)[:8], _TOOL_NAME_RECALL, len(queries), (time.time() - start) * 1000,
     )
-    return result
+    return results
+
+
+async def _recall_with_prefetch(
+    queries: list[str], message: str, prefetch: asyncio.Task | None, user: User
+) -> list[list[str]]:
+    """Recall for ``queries``, reusing the prefetched recall of ``message``.
+
+    Queries equal to the message are served by the prefetch; the others go
+    through one ``recall_many`` while the prefetch finishes. The prefetched
+    memories come first.
+    """
+    if prefetch is None:
+        return await _recall_many(queries, user)
+
+    key = message.strip().casefold()
+    other = list(dict.fromkeys(q for q in queries if q.strip().casefold() != key))
+    # Hit rate = hits / (hits + dropped); "exact" hits needed no other query
+    metrics.incr("agent.recall_prefetch.hits")
+    if not other:
+        metrics.incr("agent.recall_prefetch.exact")
+    try:
+        if not other:
+            return [await prefetch]
+        prefetched, results = await asyncio.gather(prefetch, _recall_many(other, user))
+        return [prefetched, *results]
+    finally:
+        prefetch.cancel()
 
 
 # ---------------------------------------------------------------------------
@@ -99,36 +113,60 @@ async def _dispatch_tool(
 # ---------------------------------------------------------------------------
 
 
-def _build_system_prompt(
-    user: User, mode: str, memories: list[str] | None = None
-) -> str:
+def _build_system_prompt(user: User, mode: str) -> str:
+    """Static prompt prefix: persona + the user's name.
+
+    Must stay byte-identical across turns so the LLM server can reuse its
+    KV cache for it — anything that changes per turn belongs in
+    ``_build_turn_context`` instead.
+    """
     system = JARVIS_SYSTEM_PROMPT if mode == "jarvis" else HER_SYSTEM_PROMPT
 
     if user.username:
         system += f"\n\nThe user's name is {user.username}."
 
-    if memories:
-        system += "\n\nRelevant context from past conversations:\n"
-        for mem in memories:
-            system += f"- {mem}\n"
-
     return system
 
 
-def _build_messages(
-    system_prompt: str, history: list, message: str, context_limit: int | None = None
-) -> list[dict]:
-    if context_limit is None:
-        context_limit = settings.agent_context_messages
-    messages = [{"role": "system", "content": system_prompt}]
+def _build_turn_context(
+    memories: list[str] | None = None,
+    summary: str | None = None,
+    image_pending: bool = False,
+    profile_card: str | None = None,
+) -> str | None:
+    """Per-turn context, sent as a system message right before the user message."""
+    parts = []
 
-    for msg in history[-context_limit:]:
-        messages.append({"role": msg.role, "content": msg.content})
+    # Refreshed in the background every few turns, so it stays out of the
+    # cached system prompt prefix
+    if profile_card:
+        parts.append(f"What you know about the user:\n{profile_card}")
 
-    if not history or str(history[-1].content) != message:
-        messages.append({"role": "user", "content": message})
+    if summary:
+        parts.append(f"Summary of the earlier conversation:\n{summary}")
 
-    return messages
+    if memories:
+        parts.append(
+            "Relevant context from past conversations:\n"
+            + "\n".join(f"- {mem}" for mem in memories)
+        )
+
+    if image_pending:
+        parts.append(IMAGE_CONTEXT_PROMPT)
+
+    return "\n\n".join(parts) or None
+
+
+def _build_messages(
+    system_prompt: str,
+    history: list,
+    message: str,
+    budget: int | None = None,
+    turn_context: str | None = None,
+) -> list[dict]:
+    if budget is None:
+        budget = settings.context_budget_responder
+    return build_context(system_prompt, history, message, budget, turn_context)
 
 
 # ---------------------------------------------------------------------------
@@ -169,74 +207,234 @@ async def _handle_image_generation(
 # ---------------------------------------------------------------------------
 
 
-async def _run_tool_phase(
-    message: str,
-    history: list,
-    user: User,
-) -> tuple[list[str] | None, list[str] | None]:
-    """Single supervisor call to detect and execute tool calls.
+ToolCall = tuple[str, dict]  # (tool name, parsed arguments)
+
 
-    Returns (image_result, memories) — either can be None.
+async def _route_tool_calls(message: str, user_id_short: str) -> list[ToolCall] | None:
+    """Local embedding pre-router.
+
+    Returns the tool calls to run when confident, or None to defer to the
+    supervisor LLM.
     """
-    user_id_short = str(user.id)[:8]
-    supervisor_model = settings.ollama_supervisor_model
+    try:
+        decision = await intent_router.classify(message)
+    except Exception as e:
+        logger.warning("[user:%s] intent router failed: %s", user_id_short, e)
+        return None
+
+    if not decision.is_confident:
+        metrics.incr("router.fallback")
+        logger.info(
+            "[user:%s] router: unsure (%s, confidence=%.2f, margin=%.2f), asking supervisor",
+            user_id_short, decision.intent, decision.confidence, decision.margin,
+        )
+        return None
 
-    sup_messages = [{"role": "system", "content": HER_SUPERVISOR_PROMPT}]
-    for msg in history[-settings.supervisor_context_messages:]:
-        sup_messages.append({"role": msg.role, "content": msg.content})
-    if not history or str(history[-1].content) != message:
-        sup_messages.append({"role": "user", "content": message})
+    metrics.incr(f"router.routed.{decision.intent}")
+    logger.info(
+        "[user:%s] router: %s (confidence=%.2f)",
+        user_id_short, decision.intent, decision.confidence,
+    )
+    if decision.intent == INTENT_RECALL:
+        return [(_TOOL_NAME_RECALL, {"query": message})]
+    if decision.intent == INTENT_IMAGE:
+        return [(_TOOL_NAME_IMAGE, {"prompt": message})]
+    return []
+
+
+async def _supervisor_tool_calls(
+    message: str, history: list, user_id: str
+) -> list[ToolCall]:
+    """Single supervisor LLM call to detect tool calls."""
+    user_id_short = user_id[:8]
+    supervisor_model = model_residency.resolve(settings.ollama_supervisor_model)
+
+    sup_messages = _build_messages(
+        HER_SUPERVISOR_PROMPT, history, message, settings.context_budget_supervisor
+    )
 
     logger.info(
         "[user:%s] supervisor: analyzing with %s", user_id_short, supervisor_model
     )
 
-    image_result = None
-    memories = None
-
     try:
-        response = await _client.chat.completions.create(
+        response = await llm_pool.chat(
             model=supervisor_model,
             messages=sup_messages,
             tools=ALL_TOOLS,
-            stream=False,
+            affinity_key=user_id,
         )
     except Exception as e:
         logger.error("[user:%s] supervisor LLM failed: %s", user_id_short, e)
-        return image_result, memories
-
-    msg = response.choices[0].message
+        return []
 
-    if not msg.tool_calls:
-        logger.info("[user:%s] supervisor: no tool calls needed", user_id_short)
-        return image_result, memories
-
-    for tc in msg.tool_calls:
-        tool_name = tc.function.name
+    tool_calls = []
+    for tc in response.choices[0].message.tool_calls or []:
         try:
             arguments = json.loads(tc.function.arguments)
         except json.JSONDecodeError:
             arguments = {}
+        tool_calls.append((tc.function.name, arguments))
+    return tool_calls
 
-        result = await _dispatch_tool(tool_name, arguments, user)
 
-        if result == _SENTINEL_IMAGE_REQUEST:
-            prompt = arguments.get("prompt", message)
-            context = [{"role": m.role, "content": m.content} for m in history[-6:]]
-            encoded, _ = await _handle_image_generation(
-                prompt, user, user_id_short, context
-            )
-            if encoded:
-                image_result = encoded
-
-        if tool_name == _TOOL_NAME_RECALL and result != "No relevant memories found.":
-            memories = result.split("\n")
-            logger.info(
-                "[user:%s] supervisor: recalled %d memories",
-                user_id_short, len(memories),
+async def _with_timeout(coro, timeout: float, tool_name: str, user_id_short: str, fallback):
+    """Await a tool coroutine, returning ``fallback`` if it runs past ``timeout``."""
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except TimeoutError:
+        metrics.incr(f"tools.timeout.{tool_name}")
+        logger.warning(
+            "[user:%s] tool %s timed out after %.1fs", user_id_short, tool_name, timeout
+        )
+        return fallback
+
+
+async def _generate_images(
+    prompts: list[str], user: User, user_id_short: str, context: list[dict]
+) -> list[str] | None:
+    """Run every requested image generation concurrently; images keep call order."""
+    results = await asyncio.gather(*(
+        _with_timeout(
+            _handle_image_generation(prompt, user, user_id_short, context),
+            settings.agent_image_tool_timeout,
+            _TOOL_NAME_IMAGE,
+            user_id_short,
+            (None, "Image generation timed out."),
+        )
+        for prompt in prompts
+    ))
+    images = [image for encoded, _ in results if encoded for image in encoded]
+    return images or None
+
+
+async def _run_tool_phase(
+    message: str,
+    history: list,
+    user: User,
+    message_id: uuid.UUID,
+) -> tuple[ImageJob | None, list[str] | None]:
+    """Detect and execute tool calls.
+
+    The local intent router answers first when enabled; the supervisor LLM
+    is only called when the router is not confident. Tool calls then run
+    concurrently, each under its own timeout. Recall calls are awaited here
+    as one batched ``recall_many`` (one embedding pass, one Qdrant round trip)
+    with results merged in call order; image generation is slower, so it is
+    submitted as a background job keyed by the assistant ``message_id``.
+
+    With ``agent_recall_prefetch``, a recall on the raw message starts
+    alongside the router/supervisor: it answers recall calls whose query is
+    the message itself, is merged with the results of other queries, and
+    is dropped when no recall is requested.
+
+    Returns (image_job, memories) — either can be None.
+    """
+    user_id_short = str(user.id)[:8]
+
+    image_job = None
+    memories = None
+
+    prefetch = None
+    if settings.agent_recall_prefetch:
+        prefetch = asyncio.create_task(recall(user_id=str(user.id), query=message))
+        # A dropped prefetch may still fail; don't let that surface as unretrieved
+        prefetch.add_done_callback(lambda t: t.cancelled() or t.exception())
+    try:
+        tool_calls = None
+        if settings.intent_router_enabled:
+            tool_calls = await _route_tool_calls(message, user_id_short)
+        if tool_calls is None:
+            tool_calls = await _supervisor_tool_calls(message, history, str(user.id))
+    except BaseException:
+        if prefetch:
+            prefetch.cancel()
+        raise
+
+    recall_requested = any(name == _TOOL_NAME_RECALL for name, _ in tool_calls or [])
+    if prefetch and not recall_requested:
+        prefetch.cancel()
+        metrics.incr("agent.recall_prefetch.dropped")
+
+    if not tool_calls:
+        logger.info("[user:%s] no tool calls needed", user_id_short)
+        return image_job, memories
+
+    image_prompts = []
+    recall_queries = []
+    for tool_name, arguments in tool_calls:
+        if tool_name == _TOOL_NAME_IMAGE:
+            image_prompts.append(arguments.get("prompt", message))
+        elif tool_name == _TOOL_NAME_RECALL:
+            recall_queries.append(arguments.get("query", ""))
+        else:
+            logger.warning(
+                "[user:%s] ignoring unknown tool call %s(%s)",
+                user_id_short, tool_name, json.dumps(arguments)[:80],
             )
 
-    return image_result, memories
+    if image_prompts:
+        context = [{"role": m.role, "content": m.content} for m in history]
+        image_job = image_jobs.submit(
+            message_id,
+            user.id,
+            _generate_images(image_prompts, user, user_id_short, context),
+        )
+
+    if recall_queries:
+        results = await _with_timeout(
+            _recall_with_prefetch(recall_queries, message, prefetch, user),
+            settings.agent_tool_timeout,
+            _TOOL_NAME_RECALL,
+            user_id_short,
+            None,
+        )
+        # Merge in call order, dropping memories several queries returned
+        recalled = list(dict.fromkeys(m for hits in results or [] for m in hits))
+        if recalled:
+            memories = [f"- {m}" for m in recalled]
+
+    if memories:
+        logger.info(
+            "[user:%s] supervisor: recalled %d memories", user_id_short, len(memories),
+        )
+
+    return image_job, memories
+
+
+# ---------------------------------------------------------------------------
+# Responder streaming
+# ---------------------------------------------------------------------------
+
+
+async def _stream_response(
+    messages: list[dict], model: str, user_id: str
+) -> AsyncIterator[str]:
+    """Stream the responder reply token by token (error text on failure)."""
+    user_id_short = user_id[:8]
+    logger.info("[user:%s] streaming response (model=%s)", user_id_short, model)
+    try:
+        async with aclosing(llm_pool.stream_chat(
+            model=model, messages=messages, affinity_key=user_id
+        )) as chunks:
+            async for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except Exception as e:
+        logger.error("[user:%s] streaming failed: %s", user_id_short, e)
+        yield _ERROR_RESPONSE
+
+
+async def _buffer_response(
+    messages: list[dict], model: str, user_id: str, buffer: asyncio.Queue
+) -> None:
+    """Speculative responder: push tokens into a buffer until told otherwise."""
+    try:
+        async with aclosing(_stream_response(messages, model, user_id)) as tokens:
+            async for token in tokens:
+                buffer.put_nowait(token)
+    finally:
+        buffer.put_nowait(_SPECULATIVE_DONE)
 
 
 # ---------------------------------------------------------------------------
@@ -249,50 +447,94 @@ async def run_agent(
     history: list,
     user: User,
     mode: str,
+    message_id: uuid.UUID,
+    summary: str | None = None,
 ) -> AsyncIterator[dict]:
     """Run the agent pipeline. Yields dicts:
     - {"type": "token", "content": str}        — streaming text token
-    - {"type": "image", "images": list[str]}   — base64 images
+    - {"type": "image_pending"}                 — image job submitted (see image_jobs)
     - {"type": "tool_start", "tool": str}       — tool progress indicator
     - {"type": "tool_done", "tool": str}        — tool done indicator
+
+    ``message_id`` is the id the assistant reply will be saved under; image
+    jobs are keyed by it. ``summary`` is the session's rolling summary of
+    messages older than ``history``.
+
+    Closing this generator early (client disconnect) closes the upstream
+    Ollama stream and cancels any speculative work.
+
+    With ``agent_speculative_responder`` enabled, the responder starts
+    alongside the supervisor using the tool-less prompt. Its buffered output
+    is flushed if the supervisor ends up adding no context, and discarded
+    (then regenerated with memories / image context) otherwise.
     """
     user_id_short = str(user.id)[:8]
-    responder_model = settings.ollama_her_model if mode == "her" else settings.ollama_chat_model
+    responder_model = model_residency.resolve(
+        settings.ollama_her_model if mode == "her" else settings.ollama_chat_model
+    )
 
     logger.info(
         "[user:%s] mode=%s, supervisor=%s, responder=%s",
         user_id_short, mode, settings.ollama_supervisor_model, responder_model,
     )
 
-    # Step 1: supervisor — single LLM call for tool detection
-    yield {"type": "tool_start", "tool": "analyzing"}
-    image_result, raw_memories = await _run_tool_phase(message, history, user)
-    yield {"type": "tool_done", "tool": "analyzing"}
-
-    memories = None
-    if raw_memories:
-        memories = [m.lstrip("- ").strip() for m in raw_memories if m.strip()]
-        logger.info("[user:%s] recalled %d memories", user_id_short, len(memories))
+    speculative: asyncio.Task | None = None
+    if settings.agent_speculative_responder:
+        speculative_buffer: asyncio.Queue = asyncio.Queue()
+        speculative = asyncio.create_task(_buffer_response(
+            _build_messages(
+                _build_system_prompt(user, mode),
+                history,
+                message,
+                turn_context=_build_turn_context(
+                    summary=summary, profile_card=user.profile_card
+                ),
+            ),
+            responder_model,
+            str(user.id),
+            speculative_buffer,
+        ))
 
-    if image_result:
-        yield {"type": "image", "images": image_result}
-
-    # Step 2: responder — stream the text reply
-    system_prompt = _build_system_prompt(user, mode, memories)
-    if image_result:
-        system_prompt += f"\n\n{IMAGE_CONTEXT_PROMPT}"
-    messages = _build_messages(system_prompt, history, message)
-
-    logger.info("[user:%s] streaming response (model=%s)", user_id_short, responder_model)
     try:
-        stream = await _client.chat.completions.create(
-            model=responder_model,
-            messages=messages,
-            stream=True,
+        # Step 1: supervisor — single LLM call for tool detection
+        yield {"type": "tool_start", "tool": "analyzing"}
+        image_job, raw_memories = await _run_tool_phase(message, history, user, message_id)
+        yield {"type": "tool_done", "tool": "analyzing"}
+        if image_job is not None:
+            yield {"type": "image_pending"}
+
+        if speculative is not None:
+            if image_job is None and raw_memories is None:
+                # Nothing to add to the prompt — the speculative reply is final
+                metrics.incr("agent.speculative.used")
+                logger.info("[user:%s] speculative response used", user_id_short)
+                while (token := await speculative_buffer.get()) is not _SPECULATIVE_DONE:
+                    yield {"type": "token", "content": token}
+                return
+            speculative.cancel()
+            metrics.incr("agent.speculative.wasted")
+            logger.info("[user:%s] speculative response discarded", user_id_short)
+
+        memories = None
+        if raw_memories:
+            memories = [m.lstrip("- ").strip() for m in raw_memories if m.strip()]
+            logger.info("[user:%s] recalled %d memories", user_id_short, len(memories))
+
+        # Step 2: responder — stream the text reply while any image renders
+        messages = _build_messages(
+            _build_system_prompt(user, mode),
+            history,
+            message,
+            turn_context=_build_turn_context(
+                memories, summary, image_job is not None, user.profile_card
+            ),
         )
-        async for chunk in stream:
-            if chunk.choices and chunk.choices[0].delta.content:
-                yield {"type": "token", "content": chunk.choices[0].delta.content}
-    except Exception as e:
-        logger.error("[user:%s] streaming failed: %s", user_id_short, e)
-        yield {"type": "token", "content": _ERROR_RESPONSE}
+
+        async with aclosing(
+            _stream_response(messages, responder_model, str(user.id))
+        ) as tokens:
+            async for token in tokens:
+                yield {"type": "token", "content": token}
+    finally:
+        if speculative is not None:
+            speculative.cancel()
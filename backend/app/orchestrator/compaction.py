@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.postgres import async_session, engine
+from app.db.vector import vector_store
+from app.llm.pool import llm_pool
+from app.llm.residency import model_residency
+from app.models.maintenance import MaintenanceRun
+from app.models.session import Message
+from app.models.user import User
+from app.orchestrator.memory import embed_batch
+
+logger = logging.getLogger(__name__)
+
+_PROMPTS_DIR = Path(__file__).parent / "prompts"
+_SYSTEM_PROMPT = (_PROMPTS_DIR / "memory_consolidation.txt").read_text(encoding="utf-8").strip()
+
+# pg_try_advisory_lock key: only one API worker compacts at a time
+_ADVISORY_LOCK_KEY = 7_020_001
+# maintenance_runs row holding the last finished run
+_RUN_NAME = "memory_compaction"
+# Let startup settle before an overdue run; wait this long to re-check
+# while another worker holds the lock or after a failed run
+_STARTUP_DELAY_SECONDS = 60
+_RETRY_SECONDS = 600
+# Searches timed before and after compaction, per user
+_LATENCY_SAMPLES = 5
+
+
+@dataclass
+class CompactionReport:
+    user_id: str
+    before: int
+    after: int
+    duplicates_removed: int = 0
+    clusters_summarized: int = 0
+    recall_ms_before: float = 0.0
+    recall_ms_after: float = 0.0
+    elapsed_ms: float = 0.0
+
+
+def _duplicate_groups(
+    vectors: np.ndarray, threshold: float, preference: list[int], block: int = 256
+) -> list[list[int]]:
+    """Near-duplicate groups, each listed with the row it keeps first.
+
+    Union-find links rows with cosine >= ``threshold`` into components,
+    which chain (a~b and b~c link a and c). Each component is therefore
+    split around its most preferred row (``preference`` lists rows best
+    first): only rows within ``threshold`` of that kept row join its group,
+    and the rest are split again the same way. A dropped row is always a
+    near-duplicate of the row that replaces it.
+
+    The similarity matrix is computed ``block`` rows at a time so 50k
+    memories never need the full n x n matrix in memory.
+    """
+    parent = list(range(len(vectors)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for start in range(0, len(vectors), block):
+        sims = vectors[start:start + block] @ vectors.T
+        rows, cols = np.nonzero(sims >= threshold)
+        for row, col in zip(rows + start, cols):
+            if col > row:
+                parent[find(col)] = find(row)
+
+    components: dict[int, list[int]] = {}
+    for i in preference:
+        components.setdefault(find(i), []).append(i)
+
+    groups = []
+    for remaining in components.values():
+        while len(remaining) > 1:
+            keep, rest = remaining[0], remaining[1:]
+            close = vectors[rest] @ vectors[keep] >= threshold
+            group = [keep] + [i for i, c in zip(rest, close) if c]
+            if len(group) > 1:
+                groups.append(group)
+            remaining = [i for i, c in zip(rest, close) if not c]
+    return groups
+
+
+def _clusters(vectors: np.ndarray, threshold: float, max_size: int) -> list[list[int]]:
+    """Leader clustering: each row joins the most similar cluster whose leader
+    is above ``threshold`` and that is not full, else starts a new one."""
+    leaders = np.empty_like(vectors)
+    members: list[list[int]] = []
+    for i, vector in enumerate(vectors):
+        target = None
+        sims = leaders[:len(members)] @ vector
+        for c in np.argsort(-sims):
+            if sims[c] < threshold:
+                break
+            if len(members[c]) < max_size:
+                target = c
+                break
+        if target is None:
+            leaders[len(members)] = vector
+            members.append([i])
+        else:
+            members[target].append(i)
+    return members
+
+
+def _created_at(point: dict) -> str:
+    # ISO timestamps sort chronologically; points from before the field existed sort first
+    return point["payload"].get("created_at", "")
+
+
+async def _summarize_cluster(texts: list[str]) -> str:
+    response = await llm_pool.chat(
+        model=model_residency.resolve(settings.compaction_model),
+        messages=[
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": "\n".join(f"- {t}" for t in texts)},
+        ],
+        max_tokens=settings.compaction_max_tokens,
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def _remap_message_vectors(user_id: str, replaced_by: dict[str, str]) -> None:
+    """Point ``Message.vector_id`` at the memory that replaced a deleted one."""
+    async with async_session() as db:
+        await db.execute(
+            update(Message)
+            .where(
+                Message.user_id == uuid.UUID(user_id),
+                Message.vector_id.in_(list(replaced_by)),
+            )
+            .values(vector_id=case(replaced_by, value=Message.vector_id))
+        )
+        await db.commit()
+
+
+async def _recall_latency(user_id: str, samples: list) -> float:
+    """Median ms of a recall-sized search for this user."""
+    timings = []
+    for vector in samples:
+        start = time.perf_counter()
+        await vector_store.search(list(map(float, vector)), user_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings) if timings else 0.0
+
+
+async def compact_user(user_id: str, dry_run: bool = False) -> CompactionReport | None:
+    """Deduplicate (and optionally consolidate) one user's memories.
+
+    Returns None when the user is below ``compaction_min_memories``.
+    """
+    start = time.time()
+    points = await vector_store.scroll_user(user_id)
+    if len(points) < settings.compaction_min_memories:
+        return None
+
+    vectors = np.asarray([p["vector"] for p in points], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    samples = vectors[:: max(len(vectors) // _LATENCY_SAMPLES, 1)][:_LATENCY_SAMPLES]
+    report = CompactionReport(user_id=user_id, before=len(points), after=len(points))
+    report.recall_ms_before = await _recall_latency(user_id, samples)
+
+    # 1. Near-duplicates: keep the newest (then longest) of each group
+    preference = sorted(
+        range(len(points)),
+        key=lambda i: (_created_at(points[i]), len(points[i]["payload"].get("text", ""))),
+        reverse=True,
+    )
+    groups = await asyncio.to_thread(
+        _duplicate_groups, vectors, settings.compaction_duplicate_threshold, preference
+    )
+    removed: set[int] = set()
+    # Deleted point id -> id of the point that now holds its memory
+    replaced_by: dict[str, str] = {}
+    for keep, *duplicates in groups:
+        for i in duplicates:
+            removed.add(i)
+            replaced_by[points[i]["id"]] = points[keep]["id"]
+    report.duplicates_removed = len(removed)
+
+    # 2. Old memories: merge each cluster into one LLM-written memory
+    new_ids, new_texts, new_payloads = [], [], []
+    if settings.compaction_summarize_enabled:
+        cutoff = (
+            datetime.now(timezone.utc) - timedelta(days=settings.compaction_summarize_after_days)
+        ).isoformat()
+        old = [
+            i for i in sorted(range(len(points)), key=lambda i: _created_at(points[i]))
+            if i not in removed and _created_at(points[i]) < cutoff
+        ]
+        clusters = await asyncio.to_thread(
+            _clusters,
+            vectors[old],
+            settings.compaction_cluster_threshold,
+            settings.compaction_cluster_max_size,
+        )
+        for cluster in clusters:
+            if len(cluster) < settings.compaction_cluster_min_size:
+                continue
+            members = [old[i] for i in cluster]
+            if dry_run:
+                text = ""
+            else:
+                try:
+                    text = await _summarize_cluster(
+                        [points[i]["payload"].get("text", "") for i in members]
+                    )
+                except Exception as e:
+                    logger.warning("[user:%s] cluster summary failed: %s", user_id[:8], e)
+                    continue
+            member_ids = sorted(points[i]["id"] for i in members)
+            new_id = str(
+                uuid.uuid5(uuid.NAMESPACE_URL, "ava-consolidated:" + ",".join(member_ids))
+            )
+            new_ids.append(new_id)
+            replaced_by.update(dict.fromkeys(member_ids, new_id))
+            new_texts.append(text)
+            new_payloads.append({
+                "user_id": user_id,
+                "text": text,
+                "consolidated_from": len(members),
+                "created_at": max(_created_at(points[i]) for i in members),
+                "model": settings.embedding_model_name,
+            })
+            removed.update(members)
+            report.clusters_summarized += 1
+
+    report.after = len(points) - len(removed) + len(new_ids)
+    if not dry_run and removed:
+        # Write the consolidated memories and repoint the messages before
+        # dropping what they replace
+        if new_ids:
+            embeddings = await embed_batch(new_texts)
+            await vector_store.upsert_many(new_ids, embeddings, new_payloads)
+        # A duplicate's survivor may itself have been consolidated
+        await _remap_message_vectors(
+            user_id, {old: replaced_by.get(new, new) for old, new in replaced_by.items()}
+        )
+        await vector_store.delete(user_id, [points[i]["id"] for i in removed])
+        report.recall_ms_after = await _recall_latency(user_id, samples)
+    else:
+        report.recall_ms_after = report.recall_ms_before
+
+    report.elapsed_ms = (time.time() - start) * 1000
+    metrics.incr("compaction.memories_removed", len(removed))
+    metrics.observe("compaction.user_ms", report.elapsed_ms)
+    logger.info(
+        "[user:%s] compaction: %d -> %d memories (%d duplicates, %d clusters), "
+        "recall %.1fms -> %.1fms, took %.0fms",
+        user_id[:8], report.before, report.after, report.duplicates_removed,
+        report.clusters_summarized, report.recall_ms_before, report.recall_ms_after,
+        report.elapsed_ms,
+    )
+    return report
+
+
+async def compact_all(
+    user_ids: list[str] | None = None, dry_run: bool = False
+) -> list[CompactionReport]:
+    """Compact the given users (default: everyone), one at a time."""
+    if user_ids is None:
+        async with async_session() as db:
+            user_ids = [str(uid) for uid in (await db.execute(select(User.id))).scalars()]
+    reports = []
+    for user_id in user_ids:
+        try:
+            report = await compact_user(user_id, dry_run=dry_run)
+        except Exception as e:
+            logger.error("[user:%s] compaction failed: %s", user_id[:8], e)
+            continue
+        if report:
+            reports.append(report)
+    metrics.incr("compaction.runs")
+    return reports
+
+
+class MemoryCompactor:
+    """Runs ``compact_all`` every ``compaction_interval_hours`` when enabled.
+
+    The last finished run is kept in ``maintenance_runs``, so a run that is
+    overdue starts shortly after startup however often the API restarts.
+    A Postgres advisory lock keeps several API workers from compacting at
+    the same time. It is held on a dedicated autocommit connection, so the
+    long run never leaves a transaction idle.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    async def _seconds_until_due(self, conn) -> float:
+        last = (await conn.execute(
+            select(MaintenanceRun.finished_at).where(MaintenanceRun.name == _RUN_NAME)
+        )).scalar()
+        if last is None:
+            return 0.0
+        next_run = last + timedelta(hours=settings.compaction_interval_hours)
+        return max(0.0, (next_run - datetime.now(timezone.utc)).total_seconds())
+
+    async def run_once(self) -> list[CompactionReport] | None:
+        """Compact if a run is due; None if it isn't or another worker is on it."""
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            locked = (await conn.execute(
+                select(func.pg_try_advisory_lock(_ADVISORY_LOCK_KEY))
+            )).scalar()
+            if not locked:
+                return None
+            try:
+                # Re-check under the lock: another worker may have just finished
+                if await self._seconds_until_due(conn) > 0:
+                    return None
+                reports = await compact_all()
+                now = datetime.now(timezone.utc)
+                await conn.execute(
+                    insert(MaintenanceRun)
+                    .values(name=_RUN_NAME, finished_at=now)
+                    .on_conflict_do_update(index_elements=["name"], set_={"finished_at": now})
+                )
+                return reports
+            finally:
+                await conn.execute(select(func.pg_advisory_unlock(_ADVISORY_LOCK_KEY)))
+
+    async def _loop(self) -> None:
+        await asyncio.sleep(_STARTUP_DELAY_SECONDS)
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    due_in = await self._seconds_until_due(conn)
+                if due_in > 0:
+                    await asyncio.sleep(due_in)
+                    continue
+                reports = await self.run_once()
+                if reports is not None:
+                    logger.info("Memory compaction done for %d users", len(reports))
+                    continue
+            except Exception as e:
+                logger.error("Memory compaction run failed: %s", e)
+            await asyncio.sleep(_RETRY_SECONDS)
+
+    def start(self) -> None:
+        """Called once during FastAPI lifespan startup."""
+        if settings.compaction_enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+memory_compactor = MemoryCompactor()
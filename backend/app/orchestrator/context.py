@@ -0,0 +1,125 @@
+import logging
+import math
+import threading
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.llm.pool import llm_pool
+
+logger = logging.getLogger(__name__)
+
+# Chat templates wrap every message in role markers — roughly this many tokens
+_MESSAGE_OVERHEAD_TOKENS = 4
+# Fallback estimate when no tokenizer is configured (English averages ~4 chars/token)
+_CHARS_PER_TOKEN = 4
+
+_tokenizer = None
+_tokenizer_failed = False
+_tokenizer_lock = threading.Lock()
+
+# Token counts per Message id — content never changes once a message is saved
+_message_token_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    """Load the configured HF tokenizer once; None means use the estimate."""
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is not None or _tokenizer_failed or not settings.context_tokenizer_name:
+        return _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None and not _tokenizer_failed:
+            try:
+                from transformers import AutoTokenizer
+
+                _tokenizer = AutoTokenizer.from_pretrained(settings.context_tokenizer_name)
+                logger.info("Context tokenizer loaded: %s", settings.context_tokenizer_name)
+            except Exception as e:
+                _tokenizer_failed = True
+                logger.warning(
+                    "Could not load tokenizer %s, estimating token counts: %s",
+                    settings.context_tokenizer_name, e,
+                )
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def message_tokens(msg) -> int:
+    """Token cost of a history entry (a Message row or a role/content dict)."""
+    if isinstance(msg, dict):
+        return count_tokens(str(msg.get("content", ""))) + _MESSAGE_OVERHEAD_TOKENS
+
+    key = msg.id
+    with _cache_lock:
+        cached = _message_token_cache.get(key)
+        if cached is not None:
+            _message_token_cache.move_to_end(key)
+            return cached
+    tokens = count_tokens(msg.content) + _MESSAGE_OVERHEAD_TOKENS
+    with _cache_lock:
+        _message_token_cache[key] = tokens
+        while len(_message_token_cache) > settings.context_token_cache_size:
+            _message_token_cache.popitem(last=False)
+    return tokens
+
+
+def _as_dict(msg) -> dict:
+    if isinstance(msg, dict):
+        return {"role": msg["role"], "content": str(msg.get("content", ""))}
+    return {"role": msg.role, "content": msg.content}
+
+
+def fit_history(history: list, budget: int) -> list[dict]:
+    """Newest history entries that fit in ``budget`` tokens, oldest first."""
+    kept = []
+    for msg in reversed(history):
+        cost = message_tokens(msg)
+        if cost > budget:
+            break
+        budget -= cost
+        kept.append(_as_dict(msg))
+    kept.reverse()
+    return kept
+
+
+def build_context(
+    system_prompt: str,
+    history: list,
+    message: str,
+    budget: int,
+    turn_context: str | None = None,
+) -> list[dict]:
+    """Assemble [system, ...history, (turn context), user] within a token budget.
+
+    The system prompt, the per-turn context (memories, summary...) and the
+    latest user message are always included and counted first; history
+    fills what is left, dropping the oldest messages. Keeping the per-turn
+    context after the history leaves the [system, ...history] prefix
+    unchanged from one turn to the next.
+    """
+    # Never more than fits in the server's window next to the reply
+    budget = min(budget, llm_pool.context_window() - settings.context_reply_reserve)
+    remaining = budget - count_tokens(system_prompt) - _MESSAGE_OVERHEAD_TOKENS
+    if turn_context:
+        remaining -= count_tokens(turn_context) + _MESSAGE_OVERHEAD_TOKENS
+
+    # The route saves the user message before loading history, so it is
+    # usually already the last entry
+    if history and str(_as_dict(history[-1])["content"]) == message:
+        history = history[:-1]
+    remaining -= count_tokens(message) + _MESSAGE_OVERHEAD_TOKENS
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        *fit_history(history, max(remaining, 0)),
+    ]
+    if turn_context:
+        messages.append({"role": "system", "content": turn_context})
+    messages.append({"role": "user", "content": message})
+    return messages
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.orchestrator.memory import embed, embed_batch
+
+logger = logging.getLogger(__name__)
+
+# Labeled example messages, one list per intent — edit to tune routing
+_EXEMPLARS_FILE = Path(__file__).parent / "intent_exemplars.json"
+
+INTENT_NONE = "none"
+INTENT_RECALL = "recall"
+INTENT_IMAGE = "image"
+
+
+@dataclass
+class RouteDecision:
+    intent: str
+    confidence: float
+    margin: float
+
+    @property
+    def is_confident(self) -> bool:
+        return (
+            self.confidence >= settings.intent_router_threshold
+            and self.margin >= settings.intent_router_min_margin
+        )
+
+
+class IntentRouter:
+    """Nearest-exemplar classifier on top of the MiniLM embedding model.
+
+    Each intent scores as the best cosine similarity between the message and
+    that intent's exemplars; the winner's score is the confidence, and its
+    lead over the runner-up is the margin.
+    """
+
+    def __init__(self):
+        self._labels: list[str] = []
+        self._exemplar_labels: np.ndarray | None = None
+        self._exemplar_matrix: np.ndarray | None = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_loaded(self) -> None:
+        if self._exemplar_matrix is not None:
+            return
+        async with self._lock:
+            if self._exemplar_matrix is not None:
+                return
+            exemplars: dict[str, list[str]] = json.loads(
+                _EXEMPLARS_FILE.read_text(encoding="utf-8")
+            )
+            self._labels = list(exemplars)
+            texts = [t for label in self._labels for t in exemplars[label]]
+            vectors = await embed_batch(texts)
+            self._exemplar_labels = np.array([
+                i for i, label in enumerate(self._labels) for _ in exemplars[label]
+            ])
+            self._exemplar_matrix = np.asarray(vectors, dtype=np.float32)
+            logger.info(
+                "Intent router loaded %d exemplars for %s", len(texts), self._labels
+            )
+
+    async def classify(self, message: str) -> RouteDecision:
+        await self._ensure_loaded()
+        query = np.asarray(await embed(message), dtype=np.float32)
+        similarities = self._exemplar_matrix @ query
+        scores = np.full(len(self._labels), -1.0, dtype=np.float32)
+        np.maximum.at(scores, self._exemplar_labels, similarities)
+        ranked = np.argsort(scores)[::-1]
+        best = float(scores[ranked[0]])
+        runner_up = float(scores[ranked[1]]) if len(ranked) > 1 else -1.0
+        return RouteDecision(
+            intent=self._labels[ranked[0]],
+            confidence=best,
+            margin=best - runner_up,
+        )
+
+
+intent_router = IntentRouter()
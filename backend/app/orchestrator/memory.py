@@ -2,35 +2,112 @@ import asyncio
 import logging
 import time
 import uuid
+from collections.abc import Awaitable, Callable
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 from app.core.config import settings
 from app.db.vector import vector_store
+from app.embedding.backends import WARMUP_TEXTS, load_model
+from app.embedding.batcher import EmbeddingBatcher
+from app.embedding.cache import embedding_cache
+from app.embedding.workers import embedding_workers
 
 logger = logging.getLogger(__name__)
 
-_model: SentenceTransformer | None = None
+_model = None
+_ready = False
 
 
-def _get_model() -> SentenceTransformer:
+def _get_model():
     global _model
     if _model is None:
-        logger.info("Loading embedding model %s...", settings.embedding_model_name)
-        _model = SentenceTransformer(settings.embedding_model_name)
-        logger.info("Embedding model loaded")
+        _model = load_model()
     return _model
 
 
-def _embed_sync(text: str) -> list[float]:
-    """Synchronous embedding — call via asyncio.to_thread()."""
+def _embed_batch_sync(texts: list[str]) -> list[list[float]]:
+    """Synchronous batch embedding — call via asyncio.to_thread()."""
     model = _get_model()
-    return model.encode(text, normalize_embeddings=True).tolist()
+    return model.encode(texts, normalize_embeddings=True).tolist()
+
+
+async def _encode(texts: list[str]) -> list[list[float]]:
+    """One forward pass — in the worker processes if enabled, else the thread pool."""
+    if embedding_workers.enabled:
+        return await embedding_workers.encode(texts)
+    return await asyncio.to_thread(_embed_batch_sync, texts)
+
+
+_batcher = EmbeddingBatcher(
+    _encode,
+    # The worker pool caps in-flight batches itself; the thread-pool path shares one model
+    concurrency=lambda: (
+        settings.embedding_worker_max_inflight if embedding_workers.enabled else 1
+    ),
+)
+
+
+async def _embed_one(texts: list[str]) -> list[list[float]]:
+    if settings.embedding_batching_enabled:
+        return [await _batcher.embed(texts[0])]
+    return await _encode(texts)
+
+
+async def _cache_call(fn, *args):
+    # The disk tier does file I/O; the in-memory tier is cheap enough inline
+    if settings.embedding_cache_dir:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def _cached(
+    texts: list[str], compute: Callable[[list[str]], Awaitable[list[list[float]]]]
+) -> list[list[float]]:
+    """Serve what the embedding cache has, compute and store the rest."""
+    if not embedding_cache.enabled:
+        return await compute(texts)
+    keys = [embedding_cache.key(text) for text in texts]
+    found = await _cache_call(embedding_cache.get_many, keys)
+    missing = [i for i, vector in enumerate(found) if vector is None]
+    if missing:
+        vectors = await compute([texts[i] for i in missing])
+        computed = [
+            (keys[i], np.asarray(vector, dtype=np.float32))
+            for i, vector in zip(missing, vectors)
+        ]
+        await _cache_call(embedding_cache.put_many, computed)
+        for i, (_, vector) in zip(missing, computed):
+            found[i] = vector
+    return [vector.tolist() for vector in found]
 
 
 async def embed(text: str) -> list[float]:
-    """Async-safe embedding via thread pool."""
-    return await asyncio.to_thread(_embed_sync, text)
+    """Async-safe embedding: cached, else micro-batched with concurrent calls."""
+    return (await _cached([text], _embed_one))[0]
+
+
+async def embed_batch(texts: list[str]) -> list[list[float]]:
+    """Embed several texts in a single forward pass (cache misses only)."""
+    return await _cached(texts, _encode)
+
+
+async def warmup() -> None:
+    """Load the embedding model and run a few batches through it.
+
+    Called from the FastAPI lifespan; with worker processes, one batch per
+    worker so each of them loads its copy.
+    """
+    global _ready
+    start = time.time()
+    batches = max(settings.embedding_worker_processes, 1) if embedding_workers.enabled else 1
+    await asyncio.gather(*(_encode(WARMUP_TEXTS) for _ in range(batches)))
+    _ready = True
+    logger.info("Embedding warmup done in %.0fms", (time.time() - start) * 1000)
+
+
+def is_ready() -> bool:
+    return _ready
 
 
 def extract_facts(user_message: str, assistant_response: str) -> list[str]:
@@ -44,34 +121,9 @@ def extract_facts(user_message: str, assistant_response: str) -> list[str]:
     return []
 
 
-def _upsert_sync(vector_id: str, embedding: list[float], payload: dict):
-    """Synchronous Qdrant upsert — call via asyncio.to_thread()."""
-    vector_store.upsert(vector_id=vector_id, embedding=embedding, payload=payload)
-
-
-def _search_sync(embedding: list[float], user_id: str, limit: int) -> list[dict]:
-    """Synchronous Qdrant search — call via asyncio.to_thread()."""
-    return vector_store.search(embedding=embedding, user_id=user_id, limit=limit)
-
-
-async def remember(user_id: str, text: str, source_message_id: str) -> str:
-    """Embed and store a fact. Returns the vector_id."""
-    start = time.time()
-    vector_id = str(uuid.uuid4())
-    embedding = await embed(text)
-    await asyncio.to_thread(
-        _upsert_sync,
-        vector_id,
-        embedding,
-        {
-            "user_id": user_id,
-            "text": text,
-            "source_message_id": source_message_id,
-        },
-    )
-    elapsed = (time.time() - start) * 1000
-    logger.info("[user:%s] remember() took %.0fms", user_id[:8], elapsed)
-    return vector_id
+def fact_vector_id(source_message_id: str, index: int) -> str:
+    """Deterministic point id, so re-ingesting an exchange overwrites its facts."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"ava-memory:{source_message_id}:{index}"))
 
 
 async def recall(user_id: str, query: str, limit: int | None = None) -> list[str]:
@@ -80,7 +132,7 @@ async def recall(user_id: str, query: str, limit: int | None = None) -> list[str
         limit = settings.memory_recall_limit
     start = time.time()
     embedding = await embed(query)
-    results = await asyncio.to_thread(_search_sync, embedding, user_id, limit)
+    results = await vector_store.search(embedding=embedding, user_id=user_id, limit=limit)
     elapsed = (time.time() - start) * 1000
     logger.info(
         "[user:%s] recall(%r) returned %d results in %.0fms",
@@ -89,9 +141,20 @@ async def recall(user_id: str, query: str, limit: int | None = None) -> list[str
     return [r["text"] for r in results]
 
 
-async def recall_as_tool(user_id: str, query: str) -> str:
-    """Recall memories formatted as a tool result string."""
-    memories = await recall(user_id, query)
-    if not memories:
-        return "No relevant memories found."
-    return "\n".join(f"- {m}" for m in memories)
+async def recall_many(
+    user_id: str, queries: list[str], limit: int | None = None
+) -> list[list[str]]:
+    """recall() for several queries: one embedding pass, one Qdrant round trip."""
+    if limit is None:
+        limit = settings.memory_recall_limit
+    start = time.time()
+    embeddings = await embed_batch(queries)
+    results = await vector_store.search_many(
+        embeddings=embeddings, user_id=user_id, limit=limit
+    )
+    elapsed = (time.time() - start) * 1000
+    logger.info(
+        "[user:%s] recall_many(%d queries) returned %d results in %.0fms",
+        user_id[:8], len(queries), sum(len(r) for r in results), elapsed,
+    )
+    return [[r["text"] for r in hits] for hits in results]
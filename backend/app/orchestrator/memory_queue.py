@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.postgres import async_session
+from app.db.vector import vector_store
+from app.models.memory_queue import MemoryIngestJob
+from app.models.session import Message
+from app.orchestrator.memory import embed_batch, extract_facts, fact_vector_id
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_FAILED = "failed"
+
+
+def enqueue_memory(
+    db: AsyncSession,
+    source_message_id: uuid.UUID,
+    user_id: uuid.UUID,
+    user_text: str,
+    assistant_text: str,
+) -> None:
+    """Queue an exchange for memory ingestion in the caller's transaction.
+
+    Committed together with the assistant message, so a saved reply is never
+    lost to a crash before its memories are written.
+    """
+    db.add(MemoryIngestJob(
+        source_message_id=source_message_id,
+        user_id=user_id,
+        user_text=user_text,
+        assistant_text=assistant_text,
+        status=JOB_PENDING,
+        attempts=0,
+    ))
+
+
+class MemoryIngestWorker:
+    """Drains ``memory_ingest_queue`` off the request path.
+
+    Each round claims a batch of due jobs in a short transaction (``FOR
+    UPDATE SKIP LOCKED``, so several API workers can share the queue): the
+    claim counts an attempt and leases the jobs by pushing
+    ``next_attempt_at`` ``memory_queue_lease_seconds`` ahead, so a worker
+    that dies mid-batch only delays them. With no transaction open, every
+    fact is embedded in one pass and upserted into Qdrant in one call; a
+    second transaction then bulk-updates ``Message.vector_id`` and deletes
+    the jobs. A failing batch is bisected down to the jobs that actually
+    fail, which back off exponentially up to ``memory_queue_max_attempts``.
+    Point ids derive from the source message id, so a retried job
+    overwrites rather than duplicates.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def notify(self) -> None:
+        """Nudge the worker after an enqueue instead of waiting for the next poll."""
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _claim(self) -> list[MemoryIngestJob]:
+        async with async_session() as db:
+            result = await db.execute(
+                select(MemoryIngestJob)
+                .where(
+                    MemoryIngestJob.status == JOB_PENDING,
+                    MemoryIngestJob.next_attempt_at <= func.now(),
+                )
+                .order_by(MemoryIngestJob.created_at)
+                .limit(settings.memory_queue_batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            jobs = result.scalars().all()
+            lease_until = datetime.now(timezone.utc) + timedelta(
+                seconds=settings.memory_queue_lease_seconds
+            )
+            for job in jobs:
+                job.attempts += 1
+                job.next_attempt_at = lease_until
+            await db.commit()
+        return jobs
+
+    async def process_batch(self) -> int:
+        """Ingest one batch of due jobs; returns how many were claimed."""
+        jobs = await self._claim()
+        if not jobs:
+            return 0
+
+        start = time.time()
+        vector_ids, failures = await self._ingest_isolating_failures(jobs)
+        failed_ids = {job.source_message_id for job, _ in failures}
+        done = [job for job in jobs if job.source_message_id not in failed_ids]
+
+        async with async_session() as db:
+            if vector_ids:
+                await db.execute(
+                    update(Message),
+                    [{"id": mid, "vector_id": vid} for mid, vid in vector_ids.items()],
+                )
+            if failures:
+                await db.execute(update(MemoryIngestJob), self._retries(failures))
+            if done:
+                await db.execute(
+                    delete(MemoryIngestJob).where(
+                        MemoryIngestJob.source_message_id.in_(
+                            [job.source_message_id for job in done]
+                        )
+                    )
+                )
+            await db.commit()
+
+        metrics.incr("memory_queue.jobs_done", len(done))
+        metrics.observe("memory_queue.batch_ms", (time.time() - start) * 1000)
+        logger.info(
+            "Ingested %d exchanges (%d facts, %d failed) in %.0fms",
+            len(done), len(vector_ids), len(failures), (time.time() - start) * 1000,
+        )
+        return len(jobs)
+
+    async def _ingest_isolating_failures(
+        self, jobs: list[MemoryIngestJob]
+    ) -> tuple[dict[uuid.UUID, str], list[tuple[MemoryIngestJob, Exception]]]:
+        """``_ingest`` the batch; if it fails, bisect it so one bad job
+        doesn't take the others down. Returns (vector ids, failed jobs)."""
+        try:
+            return await self._ingest(jobs), []
+        except Exception as e:
+            if len(jobs) == 1:
+                logger.warning(
+                    "[user:%s] memory ingestion for message %s failed: %s",
+                    str(jobs[0].user_id)[:8], jobs[0].source_message_id, e,
+                )
+                return {}, [(jobs[0], e)]
+        middle = len(jobs) // 2
+        vector_ids, failures = await self._ingest_isolating_failures(jobs[:middle])
+        more_ids, more_failures = await self._ingest_isolating_failures(jobs[middle:])
+        return vector_ids | more_ids, failures + more_failures
+
+    async def _ingest(self, jobs: list[MemoryIngestJob]) -> dict[uuid.UUID, str]:
+        """Embed and upsert every job's facts; returns message id -> vector id."""
+        ids, texts, payloads = [], [], []
+        vector_ids: dict[uuid.UUID, str] = {}
+        for job in jobs:
+            source = str(job.source_message_id)
+            for i, fact in enumerate(extract_facts(job.user_text, job.assistant_text)):
+                vector_id = fact_vector_id(source, i)
+                ids.append(vector_id)
+                texts.append(fact)
+                payloads.append({
+                    "user_id": str(job.user_id),
+                    "text": fact,
+                    "source_message_id": source,
+                    "created_at": job.created_at.isoformat(),
+                    # Lets a re-embed find points written by another model
+                    "model": settings.embedding_model_name,
+                })
+                vector_ids.setdefault(job.source_message_id, vector_id)
+        if texts:
+            embeddings = await embed_batch(texts)
+            await vector_store.upsert_many(ids, embeddings, payloads)
+            metrics.incr("memory_queue.facts", len(texts))
+        return vector_ids
+
+    def _retries(self, failures: list[tuple[MemoryIngestJob, Exception]]) -> list[dict]:
+        """Bulk-update rows for failed jobs (their attempt was counted at claim)."""
+        now = datetime.now(timezone.utc)
+        rows = []
+        for job, error in failures:
+            # Same keys in every row: one executemany
+            row = {
+                "source_message_id": job.source_message_id,
+                "last_error": str(error)[:1000],
+                "status": JOB_PENDING,
+                "next_attempt_at": now,
+            }
+            if job.attempts >= settings.memory_queue_max_attempts:
+                row["status"] = JOB_FAILED
+                metrics.incr("memory_queue.jobs_failed")
+                logger.error(
+                    "[user:%s] memory ingestion for message %s gave up after %d attempts",
+                    str(job.user_id)[:8], job.source_message_id, job.attempts,
+                )
+            else:
+                delay = settings.memory_queue_retry_base * 2 ** (job.attempts - 1)
+                row["next_attempt_at"] = now + timedelta(seconds=delay)
+                metrics.incr("memory_queue.retries")
+            rows.append(row)
+        return rows
+
+    async def _loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.process_batch()
+            except Exception as e:
+                logger.error("Memory ingestion loop failed: %s", e)
+                claimed = 0
+            if claimed < settings.memory_queue_batch_size:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), settings.memory_queue_poll_interval
+                    )
+                except TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        """Called once during FastAPI lifespan startup."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+memory_ingest = MemoryIngestWorker()
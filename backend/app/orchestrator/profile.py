@@ -0,0 +1,96 @@
+import logging
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import select, update
+
+from app.core import background_tasks
+from app.core.config import settings
+from app.db.postgres import async_session
+from app.llm.pool import llm_pool
+from app.llm.residency import model_residency
+from app.models.session import Message
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+_PROMPTS_DIR = Path(__file__).parent / "prompts"
+_SYSTEM_PROMPT = (_PROMPTS_DIR / "profile_extractor.txt").read_text(encoding="utf-8").strip()
+
+_in_progress: set[uuid.UUID] = set()
+# User messages seen (by this process) since the last refresh was spawned
+_new_messages: dict[uuid.UUID, int] = {}
+
+
+async def extract_profile(previous: str | None, messages: list[Message]) -> str:
+    """Fold the stable facts from ``messages`` into the previous profile card."""
+    transcript = "\n".join(
+        f"{'User' if m.role == 'user' else 'AVA'}: {m.content}" for m in messages
+    )
+    response = await llm_pool.chat(
+        model=model_residency.resolve(settings.profile_model),
+        messages=[
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": (
+                    f"Current profile card:\n{previous or '(empty)'}\n\n"
+                    f"Latest messages:\n{transcript}"
+                ),
+            },
+        ],
+        max_tokens=settings.profile_max_tokens,
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def _refresh(user_id: uuid.UUID) -> None:
+    start = time.time()
+    try:
+        async with async_session() as db:
+            user = await db.get(User, user_id)
+            if user is None:
+                return
+            query = select(Message).where(Message.user_id == user_id)
+            if user.profile_updated_at is not None:
+                query = query.where(Message.created_at > user.profile_updated_at)
+            result = await db.execute(
+                query.order_by(Message.created_at.desc()).limit(settings.profile_max_messages)
+            )
+            new = list(reversed(result.scalars().all()))
+            previous = user.profile_card
+        if sum(m.role == "user" for m in new) < settings.profile_refresh_every:
+            return
+
+        # No connection is held while the model runs
+        card = await extract_profile(previous, new)
+        async with async_session() as db:
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(profile_card=card or previous, profile_updated_at=new[-1].created_at)
+            )
+            await db.commit()
+        logger.info(
+            "[user:%s] profile card refreshed (+%d messages) in %.0fms",
+            str(user_id)[:8], len(new), (time.time() - start) * 1000,
+        )
+    except Exception as e:
+        logger.warning("[user:%s] profile card refresh failed: %s", str(user_id)[:8], e)
+    finally:
+        _in_progress.discard(user_id)
+
+
+def schedule_profile_update(user_id: uuid.UUID) -> None:
+    """Re-extract the user's profile card in the background once
+    ``profile_refresh_every`` new user messages have arrived."""
+    if not settings.profile_enabled:
+        return
+    count = _new_messages.get(user_id, 0) + 1
+    if count < settings.profile_refresh_every or user_id in _in_progress:
+        _new_messages[user_id] = count
+        return
+    _new_messages.pop(user_id, None)
+    _in_progress.add(user_id)
+    background_tasks.spawn(_refresh(user_id))
@@ -0,0 +1,101 @@
+import logging
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import func, select, update
+
+from app.core import background_tasks
+from app.core.config import settings
+from app.db.postgres import async_session
+from app.llm.pool import llm_pool
+from app.llm.residency import model_residency
+from app.models.session import Message, Session
+
+logger = logging.getLogger(__name__)
+
+_PROMPTS_DIR = Path(__file__).parent / "prompts"
+_SYSTEM_PROMPT = (_PROMPTS_DIR / "summarizer.txt").read_text(encoding="utf-8").strip()
+
+_in_progress: set[uuid.UUID] = set()
+
+
+def unsummarized_count(session: Session) -> int:
+    return (session.message_count or 0) - (session.summary_message_count or 0)
+
+
+async def summarize(previous: str | None, messages: list[Message]) -> str:
+    """Fold ``messages`` into the previous rolling summary."""
+    transcript = "\n".join(
+        f"{'User' if m.role == 'user' else 'AVA'}: {m.content}" for m in messages
+    )
+    response = await llm_pool.chat(
+        model=model_residency.resolve(settings.summary_model),
+        messages=[
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": (
+                    f"Current summary:\n{previous or '(empty)'}\n\n"
+                    f"New messages:\n{transcript}"
+                ),
+            },
+        ],
+        max_tokens=settings.summary_max_tokens,
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def _refresh(session_id: uuid.UUID) -> None:
+    start = time.time()
+    try:
+        async with async_session() as db:
+            session = await db.get(Session, session_id)
+            if session is None:
+                return
+            previous = session.summary
+            covered = session.summary_message_count or 0
+            result = await db.execute(
+                select(Message)
+                .where(Message.session_id == session_id)
+                .order_by(Message.created_at)
+                .offset(covered)
+            )
+            pending = result.scalars().all()
+        # Leave the live window to the prompt history
+        new = pending[:max(len(pending) - settings.summary_live_window, 0)]
+        if not new:
+            return
+
+        # No connection is held while the model runs
+        summary = await summarize(previous, new)
+        async with async_session() as db:
+            await db.execute(
+                update(Session)
+                .where(
+                    Session.id == session_id,
+                    # Skip if the summary moved on meanwhile
+                    func.coalesce(Session.summary_message_count, 0) == covered,
+                )
+                .values(summary=summary, summary_message_count=covered + len(new))
+            )
+            await db.commit()
+        logger.info(
+            "Session %s summary refreshed (+%d messages) in %.0fms",
+            str(session_id)[:8], len(new), (time.time() - start) * 1000,
+        )
+    except Exception as e:
+        logger.warning("Session %s summary refresh failed: %s", str(session_id)[:8], e)
+    finally:
+        _in_progress.discard(session_id)
+
+
+def schedule_summary(session: Session) -> None:
+    """Refresh the session's rolling summary in the background once enough
+    messages have piled up beyond the live window."""
+    if not settings.summary_enabled or session.id in _in_progress:
+        return
+    if unsummarized_count(session) - settings.summary_live_window < settings.summary_refresh_every:
+        return
+    _in_progress.add(session.id)
+    background_tasks.spawn(_refresh(session.id))
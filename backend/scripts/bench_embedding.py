@@ -0,0 +1,55 @@
+"""Benchmark: embedding throughput and latency per backend.
+
+    python scripts/bench_embedding.py --backends torch onnx --batch-sizes 1 8 32
+
+Reports texts/sec and per-batch latency (p50/p95) for each backend and
+batch size, after a warmup pass.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.embedding.backends import WARMUP_TEXTS, load_model  # noqa: E402
+
+TEXT = "Remember that my sister's name is Claire and she moved to Lyon last year for work."
+
+
+def bench(model, batch_size: int, rounds: int) -> tuple[float, float, float]:
+    batch = [f"{TEXT} ({i})" for i in range(batch_size)]
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        model.encode(batch, normalize_embeddings=True)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    throughput = batch_size * rounds / sum(latencies)
+    return throughput, p50, p95
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'batch':>5} {'texts/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for backend in args.backends:
+        start = time.perf_counter()
+        model = load_model(backend)
+        load_s = time.perf_counter() - start
+        model.encode(WARMUP_TEXTS, normalize_embeddings=True)
+        print(f"# {backend}: loaded in {load_s:.1f}s")
+        for batch_size in args.batch_sizes:
+            throughput, p50, p95 = bench(model, batch_size, args.rounds)
+            print(f"{backend:<8} {batch_size:>5} {throughput:>9.0f} {p50:>8.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark: prompt-eval cost of the legacy vs the prefix-stable prompt layout.
+
+Replays a synthetic conversation against one Ollama endpoint and reports,
+per layout, how many prompt tokens Ollama actually had to evaluate each
+turn (``prompt_eval_count`` excludes the KV-cache hit) and how long it took.
+
+    python scripts/bench_prompt_prefix.py --url http://localhost:11434 --model mistral
+
+legacy: memories/summary appended to the system prompt (changes every turn)
+stable: static system prompt, per-turn context right before the user message
+"""
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.orchestrator.context import build_context  # noqa: E402
+
+PERSONA = (Path(__file__).resolve().parent.parent / "app/orchestrator/prompts/jarvis.txt").read_text()
+
+USER_TURNS = [
+    "Can you help me plan my week? I have three deadlines.",
+    "The first one is the quarterly report due Wednesday.",
+    "Then a design review on Thursday morning.",
+    "And I need to prepare slides for Friday's all-hands.",
+    "What should I tackle first?",
+    "I also have a dentist appointment Tuesday at 4pm.",
+    "Can you draft a short email asking to move the design review?",
+    "Make it a bit more formal.",
+    "Thanks. Now summarize my week in bullet points.",
+    "Anything I'm forgetting?",
+]
+
+
+def layout_messages(layout: str, history: list[dict], message: str, turn: int) -> list[dict]:
+    memories = f"Relevant context from past conversations:\n- memory #{turn}: user prefers mornings"
+    system = PERSONA + "\n\nThe user's name is Sam."
+    if layout == "legacy":
+        return build_context(f"{system}\n\n{memories}", history, message, budget=3072)
+    return build_context(system, history, message, budget=3072, turn_context=memories)
+
+
+def run(url: str, model: str, layout: str) -> list[tuple[int, float]]:
+    samples = []
+    history: list[dict] = []
+    with httpx.Client(timeout=300) as client:
+        for turn, message in enumerate(USER_TURNS):
+            response = client.post(
+                f"{url}/api/chat",
+                json={
+                    "model": model,
+                    "messages": layout_messages(layout, history, message, turn),
+                    "stream": False,
+                    "keep_alive": "10m",
+                    "options": {"num_predict": 48, "seed": 0},
+                },
+            )
+            response.raise_for_status()
+            data = response.json()
+            samples.append((data.get("prompt_eval_count", 0), data.get("prompt_eval_duration", 0) / 1e6))
+            history += [
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": data["message"]["content"]},
+            ]
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:11434")
+    parser.add_argument("--model", default="mistral")
+    args = parser.parse_args()
+
+    for layout in ("legacy", "stable"):
+        samples = run(args.url, args.model, layout)
+        tokens = [t for t, _ in samples[1:]]  # first turn is always cold
+        millis = [ms for _, ms in samples[1:]]
+        print(
+            f"{layout:>7}: prompt tokens evaluated/turn mean={statistics.mean(tokens):.0f} "
+            f"total={sum(tokens)}  prompt-eval ms/turn mean={statistics.mean(millis):.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark: recall latency of the local (memory-mapped) vs the Qdrant backend.
+
+Fills one user with N random memories in each backend (scratch Qdrant
+collection and a temporary directory, both removed afterwards) and reports
+single-query search latency p50/p95, for N up to 50k.
+
+    python scripts/bench_vector_backends.py --url http://localhost:6333 --sizes 1000 10000 50000
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.db.vector import SyncVectorStore, VectorStore  # noqa: E402
+from app.db.vector_local import LocalVectorStore  # noqa: E402
+
+
+def random_vectors(n: int, dim: int, seed: int) -> list[list[float]]:
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.tolist()
+
+
+def latencies(store: SyncVectorStore, queries: list[list[float]], user_id: str) -> tuple[float, float]:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query, user_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=settings.qdrant_url)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    settings.qdrant_url = args.url
+    settings.qdrant_collection_name = f"bench_{uuid.uuid4().hex[:8]}"
+    settings.vector_local_dir = tempfile.mkdtemp()
+    dim = settings.embedding_vector_dim
+    queries = random_vectors(args.queries, dim, seed=1)
+
+    stores = {"local": SyncVectorStore(LocalVectorStore()), "qdrant": SyncVectorStore(VectorStore())}
+    for store in stores.values():
+        store.connect()
+
+    print(f"{'backend':<8} {'memories':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    try:
+        for size in args.sizes:
+            user_id = str(uuid.uuid4())
+            vectors = random_vectors(size, dim, seed=size)
+            ids = [str(uuid.uuid4()) for _ in vectors]
+            payloads = [{"user_id": user_id, "text": f"memory {i}"} for i in range(size)]
+            for name, store in stores.items():
+                store.upsert_many(ids, vectors, payloads)
+                if name == "qdrant":
+                    # Let the optimizer index the new points before measuring
+                    while store.run(store.client.get_collection(
+                        settings.qdrant_collection_name
+                    )).status != "green":
+                        time.sleep(0.5)
+                p50, p95 = latencies(store, queries, user_id)
+                print(f"{name:<8} {size:>9} {p50:>8.2f} {p95:>8.2f}")
+    finally:
+        qdrant = stores["qdrant"]
+        qdrant.run(qdrant.client.delete_collection(settings.qdrant_collection_name))
+        for store in stores.values():
+            store.close()
+        shutil.rmtree(settings.vector_local_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark: per-point vs batched Qdrant upserts and searches.
+
+Writes random unit vectors into a scratch collection (dropped afterwards)
+through SyncVectorStore and reports points/sec for one-by-one ``upsert`` vs
+``upsert_many``, and queries/sec for ``search`` vs ``search_many``.
+
+    python scripts/bench_vector_store.py --url http://localhost:6333 --points 2000
+"""
+import argparse
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.db.vector import SyncVectorStore  # noqa: E402
+
+USERS = [str(uuid.uuid4()) for _ in range(10)]
+
+
+def random_vectors(n: int, dim: int) -> list[list[float]]:
+    vectors = np.random.default_rng(0).standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.tolist()
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=settings.qdrant_url)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-batch", type=int, default=8)
+    args = parser.parse_args()
+
+    settings.qdrant_url = args.url
+    settings.qdrant_collection_name = f"bench_{uuid.uuid4().hex[:8]}"
+    store = SyncVectorStore()
+    store.connect()
+    dim = settings.embedding_vector_dim
+    try:
+        vectors = random_vectors(args.points, dim)
+        payloads = [
+            {"user_id": USERS[i % len(USERS)], "text": f"fact {i}"} for i in range(args.points)
+        ]
+
+        ids = [str(uuid.uuid4()) for _ in vectors]
+        single = timed(lambda: [
+            store.upsert(vid, vec, payload) for vid, vec, payload in zip(ids, vectors, payloads)
+        ])
+        ids = [str(uuid.uuid4()) for _ in vectors]
+        batched = timed(lambda: store.upsert_many(ids, vectors, payloads))
+        print(f"upsert       {args.points / single:>9.0f} points/s")
+        print(
+            f"upsert_many  {args.points / batched:>9.0f} points/s "
+            f"(batch={settings.qdrant_upsert_batch_size}, "
+            f"parallel={settings.qdrant_upsert_parallelism}, x{single / batched:.1f})"
+        )
+
+        queries = random_vectors(args.queries, dim)
+        user = USERS[0]
+        single = timed(lambda: [store.search(q, user) for q in queries])
+        batched = timed(lambda: [
+            store.search_many(queries[i:i + args.query_batch], user)
+            for i in range(0, len(queries), args.query_batch)
+        ])
+        print(f"search       {args.queries / single:>9.0f} queries/s")
+        print(
+            f"search_many  {args.queries / batched:>9.0f} queries/s "
+            f"(batch={args.query_batch}, x{single / batched:.1f})"
+        )
+    finally:
+        store.run(store.client.delete_collection(settings.qdrant_collection_name))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Parity check: ONNX int8 embeddings vs the reference torch model.
+
+Embeds a fixed set of sentences with both backends and fails (exit 1) if
+any pair of vectors has a cosine similarity below the threshold, or if the
+top-1 neighbour of a query changes between backends.
+
+    python scripts/check_embedding_parity.py --threshold 0.99
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.embedding.backends import load_model  # noqa: E402
+
+SENTENCES = [
+    "My sister Claire lives in Lyon.",
+    "I'm allergic to peanuts.",
+    "I work as a nurse at the city hospital.",
+    "My favourite film is Spirited Away.",
+    "We adopted a cat named Miso last spring.",
+    "I'm training for a half marathon in October.",
+    "My partner and I are moving to Berlin next year.",
+    "I hate cilantro, it tastes like soap to me.",
+    "hi",
+    "What did I tell you about my job?",
+    "Do you remember my cat's name?",
+    "Where does my sister live?",
+]
+
+
+def encode(backend: str, texts: list[str]) -> np.ndarray:
+    model = load_model(backend)
+    return np.asarray(model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=0.99)
+    parser.add_argument("--candidate", default="onnx")
+    args = parser.parse_args()
+
+    reference = encode("torch", SENTENCES)
+    candidate = encode(args.candidate, SENTENCES)
+
+    cosines = np.sum(reference * candidate, axis=1)
+    worst = int(np.argmin(cosines))
+    print(f"cosine min={cosines.min():.4f} mean={cosines.mean():.4f}")
+    print(f"worst: {cosines[worst]:.4f}  {SENTENCES[worst]!r}")
+
+    # Retrieval must not change: same nearest fact for each question
+    facts, questions = slice(0, 8), slice(9, None)
+    ref_top = np.argmax(reference[questions] @ reference[facts].T, axis=1)
+    cand_top = np.argmax(candidate[questions] @ candidate[facts].T, axis=1)
+    ranking_ok = bool(np.array_equal(ref_top, cand_top))
+    print(f"top-1 retrieval identical: {ranking_ok}")
+
+    if cosines.min() < args.threshold or not ranking_ok:
+        print("FAIL")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
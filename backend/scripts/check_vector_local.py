@@ -0,0 +1,82 @@
+"""Correctness check for the local (memory-mapped) vector backend.
+
+Runs the LocalVectorStore through the cases its file format has to get
+right, in a temporary directory, and fails (exit 1) on the first mismatch:
+
+- an id repeated within one upsert keeps only its last vector and payload
+- re-upserting an id overwrites it in place
+- delete() drops points, and search no longer returns them
+- everything survives closing and reopening the store
+
+    python scripts/check_vector_local.py
+"""
+import shutil
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.db.vector import SyncVectorStore  # noqa: E402
+from app.db.vector_local import LocalVectorStore  # noqa: E402
+
+
+def unit(seed: int) -> list[float]:
+    vector = np.random.default_rng(seed).standard_normal(settings.embedding_vector_dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def expect(name: str, actual, expected) -> None:
+    if actual != expected:
+        sys.exit(f"FAIL {name}: got {actual!r}, expected {expected!r}")
+    print(f"ok   {name}")
+
+
+def open_store() -> SyncVectorStore:
+    store = SyncVectorStore(LocalVectorStore())
+    store.connect()
+    return store
+
+
+def main() -> None:
+    settings.vector_local_dir = tempfile.mkdtemp()
+    user_id = str(uuid.uuid4())
+    a, b, c = (str(uuid.uuid4()) for _ in range(3))
+
+    def payload(text: str) -> dict:
+        return {"user_id": user_id, "text": text}
+
+    def texts(store: SyncVectorStore, query: list[float]) -> list[str]:
+        return [hit["text"] for hit in store.search(query, user_id, limit=10)]
+
+    store = open_store()
+    try:
+        store.upsert_many(
+            [a, b, a], [unit(1), unit(2), unit(3)], [payload("a1"), payload("b"), payload("a2")]
+        )
+        expect("duplicate id in one batch: one point", len(store.scroll_user(user_id)), 2)
+        expect("duplicate id in one batch: last wins", texts(store, unit(3))[0], "a2")
+        expect("duplicate id in one batch: no stale row", "a1" in texts(store, unit(1)), False)
+
+        store.upsert(a, unit(4), payload("a3"))
+        expect("overwrite across batches", sorted(texts(store, unit(4))), ["a3", "b"])
+
+        store.upsert(c, unit(5), payload("c"))
+        store.delete(user_id, [b])
+        expect("delete", sorted(texts(store, unit(2))), ["a3", "c"])
+        store.close()
+
+        store = open_store()
+        expect("reopen", sorted(texts(store, unit(5))), ["a3", "c"])
+        expect("reopen: vectors", texts(store, unit(5))[0], "c")
+    finally:
+        store.close()
+        shutil.rmtree(settings.vector_local_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Run memory compaction once and print the per-user report.
+
+    python scripts/compact_memories.py                 # every user
+    python scripts/compact_memories.py --user <uuid>   # selected users
+    python scripts/compact_memories.py --dry-run       # counts only, nothing deleted
+
+Uses the same settings as the API (COMPACTION_* for thresholds,
+COMPACTION_SUMMARIZE_ENABLED to consolidate old clusters with the LLM).
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db.vector import vector_store  # noqa: E402
+from app.llm.pool import llm_pool  # noqa: E402
+from app.orchestrator.compaction import compact_all  # noqa: E402
+
+
+async def run(user_ids: list[str] | None, dry_run: bool) -> None:
+    await vector_store.connect()
+    try:
+        reports = await compact_all(user_ids, dry_run=dry_run)
+    finally:
+        await vector_store.close()
+        await llm_pool.close()
+
+    print(
+        f"{'user':<10} {'before':>7} {'after':>7} {'dups':>6} {'clusters':>8} "
+        f"{'recall ms':>15} {'took ms':>8}"
+    )
+    for r in reports:
+        print(
+            f"{r.user_id[:8]:<10} {r.before:>7} {r.after:>7} {r.duplicates_removed:>6} "
+            f"{r.clusters_summarized:>8} {r.recall_ms_before:>6.1f} -> {r.recall_ms_after:<6.1f} "
+            f"{r.elapsed_ms:>8.0f}"
+        )
+    print(
+        f"total: {sum(r.before for r in reports)} -> {sum(r.after for r in reports)} "
+        f"memories over {len(reports)} users"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user", action="append", dest="users")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Re-embed every memory with a new embedding model and switch over atomically.
+
+Streams the live collection page by page, re-embeds the texts with the
+new model (through the app's embedding backends), writes them with the
+same point ids into a new collection, then points the
+``QDRANT_COLLECTION_NAME`` alias at it. Progress is checkpointed after
+every page; re-running the same command resumes where it stopped.
+
+    python scripts/reembed_memories.py --model BAAI/bge-small-en-v1.5 --switch
+
+Before switching, a catch-up pass re-embeds any point written to the
+source after the main pass scrolled past it and deletes points since
+removed from it. The first migration of a deployment has a real
+collection where the alias should be: pass --drop-source to delete it
+right before creating the alias (brief gap); later migrations swap the
+alias atomically. Then restart the API with EMBEDDING_MODEL_NAME /
+EMBEDDING_VECTOR_DIM set to the new model.
+
+Until that restart the running API still embeds with the old model and
+writes into the new collection. Every point records its model in the
+payload, so once the API is back on the new model:
+
+    python scripts/reembed_memories.py --model BAAI/bge-small-en-v1.5 --fix-stale
+
+re-embeds whatever the alias holds that another model wrote.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from qdrant_client import models
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.db.vector import SyncVectorStore, VectorStore  # noqa: E402
+from app.embedding.backends import load_model  # noqa: E402
+
+
+class Checkpoint:
+    """Scroll offset + progress, rewritten atomically after every page."""
+
+    def __init__(self, path: Path, source: str, target: str, model: str):
+        self.path = path
+        self.state = {
+            "source": source, "target": target, "model": model,
+            "offset": None, "migrated": 0, "done": False,
+        }
+        if path.exists():
+            saved = json.loads(path.read_text())
+            if (saved["source"], saved["target"], saved["model"]) != (source, target, model):
+                sys.exit(f"Checkpoint {path} belongs to another migration: {saved}")
+            self.state = saved
+            print(f"Resuming after {saved['migrated']} points")
+
+    def save(self, **changes) -> None:
+        self.state.update(changes)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state))
+        tmp.replace(self.path)
+
+
+def resolve_source(store: SyncVectorStore, alias: str) -> str:
+    """Collection the alias currently points to (or the alias itself if it is
+    still a plain collection)."""
+    aliases = store.run(store.client.get_aliases()).aliases
+    for a in aliases:
+        if a.alias_name == alias:
+            return a.collection_name
+    return alias
+
+
+def reembed(model, texts: list[str], batch_size: int) -> list[list[float]]:
+    return model.encode(texts, batch_size=batch_size, normalize_embeddings=True).tolist()
+
+
+def copy_page(store, model, points, target: str, args) -> None:
+    points = [p for p in points if p.payload and p.payload.get("text")]
+    if not points:
+        return
+    store.upsert_many(
+        [str(p.id) for p in points],
+        reembed(model, [p.payload["text"] for p in points], args.embed_batch),
+        [{**p.payload, "model": args.model} for p in points],
+        collection=target,
+    )
+
+
+def _scroll_ids(store, collection: str, args):
+    """Every point id in ``collection``, one page at a time."""
+    offset = None
+    while True:
+        points, offset = store.run(store.client.scroll(
+            collection_name=collection,
+            limit=args.page_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        ))
+        yield [p.id for p in points]
+        if offset is None:
+            return
+
+
+def _existing(store, collection: str, ids: list) -> set[str]:
+    return {
+        str(p.id) for p in store.run(store.client.retrieve(
+            collection_name=collection, ids=ids, with_payload=False, with_vectors=False,
+        ))
+    }
+
+
+def main_pass(store, model, checkpoint: Checkpoint, args) -> None:
+    source, target = checkpoint.state["source"], checkpoint.state["target"]
+    total = store.run(store.client.count(source)).count
+    offset = checkpoint.state["offset"]
+    start = time.time()
+    migrated_at_start = checkpoint.state["migrated"]
+    while True:
+        points, offset = store.run(store.client.scroll(
+            collection_name=source,
+            limit=args.page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        ))
+        copy_page(store, model, points, target, args)
+        migrated = checkpoint.state["migrated"] + len(points)
+        checkpoint.save(offset=offset, migrated=migrated, done=offset is None)
+        rate = (migrated - migrated_at_start) / max(time.time() - start, 1e-6)
+        print(f"\r{migrated}/{total} points ({rate:.0f}/s)", end="", flush=True)
+        if offset is None:
+            print()
+            return
+
+
+def catch_up(store, model, source: str, target: str, args) -> tuple[int, int]:
+    """Make the target hold exactly the source's ids: re-embed points missing
+    from it, delete points no longer in the source. Returns (copied, deleted)."""
+    copied = deleted = 0
+    for ids in _scroll_ids(store, source, args):
+        existing = _existing(store, target, ids)
+        missing = [i for i in ids if str(i) not in existing]
+        if missing:
+            points = store.run(store.client.retrieve(
+                collection_name=source, ids=missing, with_payload=True, with_vectors=False,
+            ))
+            copy_page(store, model, points, target, args)
+            copied += len(missing)
+    for ids in _scroll_ids(store, target, args):
+        existing = _existing(store, source, ids)
+        stale = [i for i in ids if str(i) not in existing]
+        if stale:
+            store.run(store.client.delete(
+                collection_name=target, points_selector=models.PointIdsList(points=stale),
+            ))
+            deleted += len(stale)
+    return copied, deleted
+
+
+def fix_stale(store, model, collection: str, args) -> int:
+    """Re-embed points whose payload names another model (or none)."""
+    stale = models.Filter(must_not=[
+        models.FieldCondition(key="model", match=models.MatchValue(value=args.model)),
+    ])
+    fixed = 0
+    offset = None
+    while True:
+        points, offset = store.run(store.client.scroll(
+            collection_name=collection,
+            scroll_filter=stale,
+            limit=args.page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        ))
+        copy_page(store, model, points, collection, args)
+        fixed += len(points)
+        if offset is None:
+            return fixed
+
+
+def switch_alias(store, alias: str, source: str, target: str) -> None:
+    client = store.client
+    if source == alias:
+        store.run(client.delete_collection(alias))
+        store.run(client.update_collection_aliases(change_aliases_operations=[
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(collection_name=target, alias_name=alias)
+            ),
+        ]))
+        return
+    # Delete + create in one request: readers see either the old or the new target
+    store.run(client.update_collection_aliases(change_aliases_operations=[
+        models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)),
+        models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=target, alias_name=alias)
+        ),
+    ]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True, help="new embedding model name")
+    parser.add_argument("--backend", default=settings.embedding_backend)
+    parser.add_argument("--target", help="new collection (default: alias + model slug)")
+    parser.add_argument("--page-size", type=int, default=512)
+    parser.add_argument("--embed-batch", type=int, default=128)
+    parser.add_argument("--checkpoint", type=Path)
+    parser.add_argument("--switch", action="store_true", help="point the alias at the new collection")
+    parser.add_argument("--drop-source", action="store_true")
+    parser.add_argument(
+        "--fix-stale", action="store_true",
+        help="after the API restart: re-embed points another model wrote under the alias",
+    )
+    args = parser.parse_args()
+
+    alias = settings.qdrant_collection_name
+    target = args.target or f"{alias}_{re.sub(r'[^a-z0-9]+', '_', args.model.lower()).strip('_')}"
+    checkpoint_path = args.checkpoint or Path(f"reembed_{target}.checkpoint.json")
+
+    model = load_model(args.backend, args.model)
+    dim = model.get_sentence_embedding_dimension()
+
+    store = SyncVectorStore(VectorStore())
+    # Don't let connect() provision a collection under the alias name
+    store.connect(provision=False)
+    try:
+        if args.fix_stale:
+            fixed = fix_stale(store, model, alias, args)
+            print(f"Re-embedded {fixed} points written by another model")
+            return
+        source = resolve_source(store, alias)
+        if source == target:
+            sys.exit(f"{alias} already points to {target}")
+        if args.switch and source == alias and not args.drop_source:
+            sys.exit(
+                f"{alias} is a collection, not an alias yet: re-run with --drop-source "
+                "to replace it with an alias to the new collection"
+            )
+        checkpoint = Checkpoint(checkpoint_path, source, target, args.model)
+        if not store.run(store.client.collection_exists(target)):
+            store.create_collection(target, dim)
+            print(f"Created {target} (dim={dim})")
+
+        if not checkpoint.state["done"]:
+            main_pass(store, model, checkpoint, args)
+
+        if args.switch:
+            copied, deleted = catch_up(store, model, source, target, args)
+            print(f"Catch-up: {copied} points written and {deleted} deleted since the main pass")
+            switch_alias(store, alias, source, target)
+            print(f"{alias} -> {target}. Restart the API with EMBEDDING_MODEL_NAME={args.model} "
+                  f"EMBEDDING_VECTOR_DIM={dim}, then re-run with --fix-stale")
+            checkpoint_path.unlink(missing_ok=True)
+        else:
+            print(f"Done. Re-run with --switch to point {alias} at {target}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
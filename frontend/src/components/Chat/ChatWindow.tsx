@@ -58,7 +58,7 @@ export default function ChatWindow() {
       .get(`/chat/history?session_id=${sessionId}`)
       .then(({ data }) => {
         if (cancelled) return;
-        const loaded = data.map((m: { id: string; role: string; content: string; mode: string; image_urls: string[] | null }) => ({
+        const loaded = data.messages.map((m: { id: string; role: string; content: string; mode: string; image_urls: string[] | null }) => ({
           id: m.id,
           role: m.role as "user" | "assistant",
           content: m.content,
@@ -66,7 +66,7 @@ export default function ChatWindow() {
         }));
         if (loaded.length > 0) {
           setMessages(loaded);
-          const lastMode = data[data.length - 1]?.mode;
+          const lastMode = data.messages[data.messages.length - 1]?.mode;
           if (lastMode) setMode(lastMode as "jarvis" | "her");
         }
       })
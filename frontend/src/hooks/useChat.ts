@@ -1,7 +1,31 @@
 import { useCallback } from "react";
 import { fetchEventSource } from "@microsoft/fetch-event-source";
+import api from "../api/client";
 import { useChatStore } from "../store/chatStore";
 
+const IMAGE_POLL_INTERVAL_MS = 3000;
+const IMAGE_POLL_MAX_ATTEMPTS = 100;
+
+// Image jobs can outlive the SSE stream — poll until the images land
+async function pollMessageImages(
+  serverMsgId: string,
+  onImages: (urls: string[]) => void
+) {
+  for (let attempt = 0; attempt < IMAGE_POLL_MAX_ATTEMPTS; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, IMAGE_POLL_INTERVAL_MS));
+    try {
+      const { data } = await api.get(`/chat/messages/${serverMsgId}/images`);
+      if (data.image_urls) {
+        onImages(data.image_urls);
+        return;
+      }
+      if (data.status !== "pending") return;
+    } catch {
+      // message not saved yet — keep polling
+    }
+  }
+}
+
 export function useChat() {
   const {
     addUserMessage,
@@ -26,6 +50,7 @@ export function useChat() {
       addAssistantMessage(assistantMsgId);
 
       const token = localStorage.getItem("access_token");
+      let pendingImageMsgId: string | null = null;
 
       await fetchEventSource("/api/v1/chat/message", {
         method: "POST",
@@ -51,10 +76,20 @@ export function useChat() {
             }
 
             // Handle image events
+            if (data.event === "image_pending") {
+              pendingImageMsgId = data.msg_id;
+              return;
+            }
             if (data.event === "image" && data.image_urls) {
+              pendingImageMsgId = null;
               setMessageImages(assistantMsgId, data.image_urls);
               return;
             }
+            if (data.event === "image_failed") {
+              pendingImageMsgId = null;
+              appendToken(assistantMsgId, "\n\n(The photo couldn't be generated.)");
+              return;
+            }
 
             if (data.token) {
               appendToken(assistantMsgId, data.token);
@@ -71,6 +106,11 @@ export function useChat() {
         },
         onclose() {
           finishStreaming(assistantMsgId);
+          if (pendingImageMsgId) {
+            pollMessageImages(pendingImageMsgId, (urls) =>
+              setMessageImages(assistantMsgId, urls)
+            );
+          }
           throw new Error("done"); // prevent fetchEventSource from auto-retrying
         },
         onerror(err) {